@@ -0,0 +1,7 @@
+"""
+Benchmarks for user_api
+
+Each module is runnable on its own, e.g. `python -m benchmarks.login`.
+They run against a throwaway test database created from the configured
+settings, never against the configured database itself.
+"""
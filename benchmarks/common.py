@@ -0,0 +1,79 @@
+import contextlib
+import os
+import time
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'undefined_api.settings')
+    import django
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database(verbosity=0):
+    """
+    creates a migrated test database for the duration of the block
+    """
+    from django.db import connection
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def phone_number(index):
+    return '010-{:04d}-{:04d}'.format(index // 10000, index % 10000)
+
+
+def seed_users(start, stop, password='Benchpwd!999', batch_size=5000):
+    """
+    inserts users [start, stop) with bulk_create
+    every row shares one password hash, so seeding does not pay a KDF per row
+    """
+    from django.contrib.auth.hashers import make_password
+    from user_api.models import UserModel, normalize_login_name
+
+    password_hash = make_password(password)
+    for batch_start in range(start, stop, batch_size):
+        batch = []
+        for index in range(batch_start, min(batch_start + batch_size, stop)):
+            name = 'user{}'.format(index)
+            batch.append(UserModel(
+                name=name, login_key=normalize_login_name(name), email='{}@bench.test'.format(name),
+                password=password_hash, phone_number=phone_number(index),
+                age=20 + index % 50, gender='MW'[index % 2]))
+        UserModel.objects.bulk_create(batch)
+
+
+def measure(func, repeat):
+    """
+    calls func repeat times
+    :return: list of durations in seconds
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    """
+    :return: dict of latency figures in milliseconds
+    """
+    return {
+        'count': len(samples),
+        'mean_ms': sum(samples) / len(samples) * 1000,
+        'p50_ms': percentile(samples, 0.50) * 1000,
+        'p95_ms': percentile(samples, 0.95) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+    }
@@ -0,0 +1,71 @@
+"""
+Compression ratio and CPU time per content coding and level
+
+    python -m benchmarks.compression --rows 1000
+
+Compresses one rendered list page of --rows users with every installed
+coding at a few levels, whole and as a stream of one chunk per row the way
+`?stream=ndjson` sends it.
+"""
+import argparse
+
+from benchmarks.common import measure, seed_users, setup_django, summarize, test_database
+
+LEVELS = {'gzip': (1, 6, 9), 'br': (1, 4, 6), 'zstd': (1, 3, 9)}
+
+
+def run(rows, repeat, flush_size):
+    from user_api.compression import COMPRESSORS, _compress_stream
+    from user_api.models import UserModel
+    from user_api.representation import render_json
+    from user_api.serializers import user_representation
+
+    seed_users(0, rows)
+    page = list(UserModel.objects.order_by('user_id').values(*user_representation.columns)[:rows])
+    body = render_json({'next': None, 'previous': None, 'results': user_representation.many(page)})
+    chunks = [render_json(row) + b'\n' for row in user_representation.many(page)]
+
+    results = []
+    for encoding, compressor_class in sorted(COMPRESSORS.items()):
+        for level in LEVELS[encoding]:
+            def whole():
+                compressor = compressor_class(level)
+                return compressor.compress(body) + compressor.finish()
+
+            def streamed():
+                return b''.join(_compress_stream(chunks, compressor_class(level), flush_size, 'benchmark'))
+
+            results.append({
+                'encoding': encoding,
+                'level': level,
+                'bytes': len(body),
+                'compressed': len(whole()),
+                'stream_compressed': len(streamed()),
+                'compress': summarize(measure(whole, repeat)),
+                'stream_compress': summarize(measure(streamed, repeat)),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000, help='users per page')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--flush-size', type=int, default=65536, help='stream input bytes between flushes')
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        results = run(args.rows, args.repeat, args.flush_size)
+
+    print('{:>8} {:>5} {:>10} {:>10} {:>7} {:>10} {:>10} {:>10}'.format(
+        'encoding', 'level', 'bytes', 'whole', 'ratio', 'p50', 'stream', 'p50'))
+    for result in results:
+        print('{:>8} {:>5} {:>10} {:>10} {:>7.3f} {:>8.2f}ms {:>10} {:>8.2f}ms'.format(
+            result['encoding'], result['level'], result['bytes'], result['compressed'],
+            result['compressed'] / result['bytes'], result['compress']['p50_ms'],
+            result['stream_compressed'], result['stream_compress']['p50_ms']))
+
+
+if __name__ == '__main__':
+    main()
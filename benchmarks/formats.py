@@ -0,0 +1,57 @@
+"""
+Payload size and encode time per response format and field selection
+
+    python -m benchmarks.formats --rows 1000
+
+Encodes one list page of --rows users with every installed renderer, for
+all fields, `fields=name` and `fields=user_id,name`. Timings include the query.
+"""
+import argparse
+
+from benchmarks.common import measure, seed_users, setup_django, summarize, test_database
+
+
+def run(rows, repeat):
+    from rest_framework.renderers import JSONRenderer
+    from user_api.models import UserModel
+    from user_api.renderers import COMPACT_RENDERERS, NDJSONRenderer
+    from user_api.serializers import user_fields_representation, user_representation
+
+    seed_users(0, rows)
+    selections = [('all', user_representation)] + [
+        (fields, user_fields_representation.restrict(fields.split(','))) for fields in ('name', 'user_id,name')]
+    renderers = [JSONRenderer()] + [renderer() for renderer in COMPACT_RENDERERS] + [NDJSONRenderer()]
+    results = []
+    for label, representation in selections:
+        for renderer in renderers:
+            def encode():
+                page = UserModel.objects.order_by('user_id').values(*representation.columns)[:rows]
+                return renderer.render({'next': None, 'previous': None, 'results': representation.many(page)})
+
+            results.append({
+                'fields': label,
+                'format': renderer.format,
+                'bytes': len(encode()),
+                'encode': summarize(measure(encode, repeat)),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000, help='users per page')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        results = run(args.rows, args.repeat)
+
+    print('{:>14} {:>8} {:>10} {:>10}'.format('fields', 'format', 'bytes', 'p50'))
+    for result in results:
+        print('{:>14} {:>8} {:>10} {:>8.2f}ms'.format(
+            result['fields'], result['format'], result['bytes'], result['encode']['p50_ms']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Primary key layout: insert rate and B-tree locality per id scheme
+
+    python -m benchmarks.ids --rows 200000
+
+Each scheme fills its own SQLite table clustered on the key (WITHOUT ROWID,
+like an InnoDB primary key). "append" is the share of inserts that landed
+after the current largest key, i.e. on the right edge of the index; the
+rest split pages somewhere in the middle. uuid1 hex is the previous layout,
+uuid7 compact the current one. uuid1 leads with the low 32 bits of its
+timestamp, which wrap every ~7 minutes: a short run looks sequential, a
+table filled over days does not.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+
+from benchmarks.common import setup_django
+
+
+def run(rows, batch_size, generators):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, generate in generators:
+            for layout in ('hex', 'compact'):
+                connection = sqlite3.connect(os.path.join(directory, '{}_{}.sqlite3'.format(name, layout)))
+                column = 'char(32)' if layout == 'hex' else 'blob'
+                connection.execute('CREATE TABLE users (user_id {} PRIMARY KEY, name text) WITHOUT ROWID'
+                                   .format(column))
+                largest = None
+                appended = 0
+                elapsed = 0.0
+                for start in range(0, rows, batch_size):
+                    batch = []
+                    for index in range(start, min(start + batch_size, rows)):
+                        key = generate()
+                        key = key.hex if layout == 'hex' else key.bytes
+                        if largest is None or key > largest:
+                            largest = key
+                            appended += 1
+                        batch.append((key, 'user{}'.format(index)))
+                    started = time.perf_counter()
+                    with connection:
+                        connection.executemany('INSERT INTO users VALUES (?, ?)', batch)
+                    elapsed += time.perf_counter() - started
+                pages = connection.execute('PRAGMA page_count').fetchone()[0]
+                connection.close()
+                results.append({
+                    'scheme': name,
+                    'layout': layout,
+                    'rows_per_s': rows / elapsed,
+                    'append': appended / rows,
+                    'pages': pages,
+                })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000, help='rows per table')
+    parser.add_argument('--batch-size', type=int, default=1000, help='rows per transaction')
+    args = parser.parse_args()
+
+    setup_django()
+    from user_api.ids import uuid7
+
+    results = run(args.rows, args.batch_size, [('uuid1', uuid.uuid1), ('uuid4', uuid.uuid4), ('uuid7', uuid7)])
+    print('{:>6} {:>8} {:>12} {:>8} {:>8}'.format('scheme', 'layout', 'rows/s', 'append', 'pages'))
+    for result in results:
+        print('{:>6} {:>8} {:>12.0f} {:>7.1%} {:>8}'.format(
+            result['scheme'], result['layout'], result['rows_per_s'], result['append'], result['pages']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Instrumentation overhead per sample rate
+
+    python -m benchmarks.instrumentation --rates 0,0.01,0.1,1 --repeat 2000
+
+Drives GET /users/<uuid>/ (detail cache hit, the cheapest request the API
+serves, so the relative overhead is at its largest) through the full
+middleware stack and reports the latency against an uninstrumented run.
+"""
+import argparse
+import base64
+
+from benchmarks.common import measure, seed_users, setup_django, summarize, test_database
+
+
+def run(rates, repeat):
+    from django.contrib.auth.models import User
+    from django.test import Client, override_settings
+    from user_api.models import UserModel
+
+    seed_users(0, 100)
+    User.objects.create_user('bench', password='Benchpwd!999', is_staff=True)
+    credentials = base64.b64encode(b'bench:Benchpwd!999').decode()
+    path = '/users/{}/'.format(UserModel.objects.values_list('user_id', flat=True).first())
+
+    results = []
+    for rate in [None] + rates:
+        if rate is None:
+            middleware = [name for name in _middleware() if not name.startswith('user_api.instrumentation')]
+            overrides = override_settings(MIDDLEWARE=middleware)
+        else:
+            overrides = override_settings(INSTRUMENTATION={'SAMPLE_RATE': rate, 'SERVER_TIMING': True})
+        with overrides:
+            client = Client(SERVER_NAME='localhost', HTTP_AUTHORIZATION='Basic {}'.format(credentials))
+
+            def request():
+                response = client.get(path)
+                assert response.status_code == 200, response.status_code
+
+            measure(request, repeat // 10)
+            results.append({'rate': rate, 'latency': summarize(measure(request, repeat))})
+    return results
+
+
+def _middleware():
+    from django.conf import settings
+    return settings.MIDDLEWARE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rates', default='0,0.01,0.1,1', help='comma separated sample rates')
+    parser.add_argument('--repeat', type=int, default=2000, help='requests per rate')
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        results = run([float(rate) for rate in args.rates.split(',')], args.repeat)
+
+    baseline = results[0]['latency']['p50_ms']
+    print('{:>12} {:>10} {:>10} {:>10}'.format('sample rate', 'p50', 'p99', 'overhead'))
+    for result in results:
+        latency = result['latency']
+        print('{:>12} {:>8.3f}ms {:>8.3f}ms {:>9.1%}'.format(
+            'off' if result['rate'] is None else result['rate'], latency['p50_ms'], latency['p99_ms'],
+            latency['p50_ms'] / baseline - 1))
+
+
+if __name__ == '__main__':
+    main()
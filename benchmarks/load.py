@@ -0,0 +1,108 @@
+"""
+HTTP load generator for comparing deployments
+
+    gunicorn undefined_api.wsgi --workers 4 --bind 127.0.0.1:8000
+    python -m benchmarks.load --url http://127.0.0.1:8000/users/ --user admin --password ... --concurrency 200
+
+    uvicorn undefined_api.asgi:application --workers 4 --port 8001
+    python -m benchmarks.load --url http://127.0.0.1:8001/users/ --user admin --password ... --concurrency 200
+
+Each client keeps one keep-alive connection and issues requests back to back
+for --duration seconds; --think adds a pause between requests to emulate slow
+clients. Reports throughput and latency percentiles, --json prints them as json.
+"""
+import argparse
+import base64
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.common import summarize
+
+
+def _client(url, method, headers, body, deadline, think, samples, errors, lock):
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    path = parts.path + ('?' + parts.query if parts.query else '')
+    connection = connection_class(parts.netloc, timeout=30)
+    local_samples, local_errors = [], 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, body=body() if callable(body) else body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                local_errors += 1
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            connection.close()
+            connection = connection_class(parts.netloc, timeout=30)
+            continue
+        local_samples.append(time.perf_counter() - started)
+        if think:
+            time.sleep(think)
+    connection.close()
+    with lock:
+        samples.extend(local_samples)
+        errors.append(local_errors)
+
+
+def run(url, concurrency, duration, method='GET', user=None, password=None, body=None, think=0.0):
+    """
+    drives url with concurrency clients for duration seconds
+    body may be a callable returning a fresh body for every request
+    :return: dict with throughput, error count and latency summary
+    """
+    headers = {'Content-Type': 'application/json'}
+    if user is not None:
+        token = base64.b64encode('{}:{}'.format(user, password).encode('utf-8')).decode('ascii')
+        headers['Authorization'] = 'Basic {}'.format(token)
+
+    samples, errors, lock = [], [], threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=_client, args=(url, method, headers, body, deadline, think,
+                                                      samples, errors, lock))
+               for _ in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    result = {'url': url, 'concurrency': concurrency, 'duration_s': elapsed,
+              'requests': len(samples), 'errors': sum(errors),
+              'throughput_rps': len(samples) / elapsed if elapsed else 0.0}
+    if samples:
+        result.update(summarize(samples))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', required=True)
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--body', default=None, help='request body, e.g. a json document')
+    parser.add_argument('--user', default=None, help='basic auth user')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('--think', type=float, default=0.0, help='seconds each client waits between requests')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    result = run(args.url, args.concurrency, args.duration, method=args.method, user=args.user,
+                 password=args.password, body=args.body, think=args.think)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print('{requests} requests, {errors} errors in {duration_s:.1f}s: {throughput_rps:.1f} req/s'.format(**result))
+    if result['requests']:
+        print('p50 {p50_ms:.2f}ms  p95 {p95_ms:.2f}ms  p99 {p99_ms:.2f}ms'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Login latency as the user table grows
+
+    python -m benchmarks.login --sizes 1000,10000,100000,1000000
+
+For each table size this reports the indexed login_key lookup on its own and
+the full POST /sessions/ (lookup + password hash check). Both should stay
+flat as the table grows; the hash check dominates the full login.
+"""
+import argparse
+import random
+
+from benchmarks.common import measure, seed_users, setup_django, summarize, test_database
+
+
+def run(sizes, repeat):
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from user_api.models import UserModel, normalize_login_name
+    from user_api.views import LoginView
+
+    factory = APIRequestFactory()
+    view = LoginView.as_view()
+    client = User.objects.create_user('bench', password='Benchpwd!999', is_staff=True)
+    seeded = 0
+    results = []
+    for size in sizes:
+        seed_users(seeded, size)
+        seeded = size
+
+        def lookup():
+            name = 'user{}'.format(random.randrange(seeded))
+            list(UserModel.objects.filter(login_key=normalize_login_name(name)).only('user_id', 'password'))
+
+        def login():
+            name = 'user{}'.format(random.randrange(seeded))
+            request = factory.post('/sessions/', {'name': name, 'password': 'Benchpwd!999'})
+            force_authenticate(request, user=client)
+            response = view(request)
+            assert response.status_code == 200, response.data
+
+        results.append({
+            'rows': size,
+            'lookup': summarize(measure(lookup, repeat * 10)),
+            'login': summarize(measure(login, repeat)),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma separated table sizes')
+    parser.add_argument('--repeat', type=int, default=20, help='logins per table size')
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        results = run([int(size) for size in args.sizes.split(',')], args.repeat)
+
+    print('{:>10} {:>12} {:>12} {:>12} {:>12}'.format(
+        'rows', 'lookup p50', 'lookup p99', 'login p50', 'login p99'))
+    for result in results:
+        print('{:>10} {:>10.3f}ms {:>10.3f}ms {:>10.3f}ms {:>10.3f}ms'.format(
+            result['rows'], result['lookup']['p50_ms'], result['lookup']['p99_ms'],
+            result['login']['p50_ms'], result['login']['p99_ms']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Registration uniqueness check of phone_number with and without the in-process index
+
+    python -m benchmarks.phone_index --users 100000 --lookups 2000
+
+Seeds --users users, builds the index and runs the phone_number validators of
+UserCreateSerializer on new numbers (the common case) and on taken ones,
+with the index and with every check going to the database.
+"""
+import argparse
+
+from benchmarks.common import measure, phone_number, seed_users, setup_django, summarize, test_database
+
+
+def run(users, lookups):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.exceptions import ValidationError
+    from user_api.phone_index import phone_number_index
+    from user_api.serializers import UserCreateSerializer
+
+    seed_users(0, users)
+    field = UserCreateSerializer().fields['phone_number']
+    loaded = summarize(measure(phone_number_index.load, 3))
+
+    def validate(numbers):
+        def validate_all():
+            for number in numbers:
+                try:
+                    field.run_validators(number)
+                except ValidationError:
+                    pass
+        return validate_all
+
+    cases = {
+        'new': [phone_number(users + index) for index in range(lookups)],
+        'taken': [phone_number(index * users // lookups) for index in range(lookups)],
+    }
+    results = []
+    for case, numbers in cases.items():
+        for enabled in (False, True):
+            phone_number_index.enabled = enabled
+            samples = measure(validate(numbers), 3)
+            with CaptureQueriesContext(connection) as queries:
+                validate(numbers)()
+            results.append({
+                'case': case,
+                'index': enabled,
+                'per_check_us': summarize(samples)['p50_ms'] * 1000 / lookups,
+                'queries': len(queries),
+            })
+    phone_number_index.enabled = True
+    return loaded, phone_number_index.stats(), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--lookups', type=int, default=2000, help='numbers validated per case')
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        loaded, stats, results = run(args.users, args.lookups)
+
+    print('index of {} numbers: {} bytes, loaded in {:.1f}ms (p50)'.format(
+        stats['entries'], stats['bytes'], loaded['p50_ms']))
+    print('{:>6} {:>6} {:>12} {:>8}'.format('case', 'index', 'per check', 'queries'))
+    for result in results:
+        print('{:>6} {:>6} {:>10.1f}us {:>8}'.format(
+            result['case'], 'on' if result['index'] else 'off', result['per_check_us'], result['queries']))
+
+
+if __name__ == '__main__':
+    main()
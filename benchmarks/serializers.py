@@ -0,0 +1,58 @@
+"""
+User list serialization, DRF UserSerializer against the RowRepresentation fast path
+
+    python -m benchmarks.serializers --sizes 10,1000,100000
+
+Both sides include the query, building the data and rendering json bytes.
+"""
+import argparse
+
+from benchmarks.common import measure, seed_users, setup_django, summarize, test_database
+
+
+def run(sizes, repeat):
+    from rest_framework.renderers import JSONRenderer
+    from user_api.models import UserModel
+    from user_api.representation import orjson, render_json
+    from user_api.serializers import UserSerializer, user_representation
+
+    seed_users(0, max(sizes))
+    queryset = UserModel.objects.order_by('user_id')
+    renderer = JSONRenderer()
+    results = []
+    for size in sizes:
+        def serializer():
+            return renderer.render(UserSerializer(queryset[:size], many=True).data)
+
+        def fast_path():
+            return render_json(user_representation.many(queryset.values(*user_representation.columns)[:size]))
+
+        assert serializer() == fast_path()
+        results.append({
+            'rows': size,
+            'serializer': summarize(measure(serializer, repeat)),
+            'fast_path': summarize(measure(fast_path, repeat)),
+        })
+    return results, orjson is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10,1000,100000', help='comma separated row counts')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        results, with_orjson = run([int(size) for size in args.sizes.split(',')], args.repeat)
+
+    print('json encoder: {}'.format('orjson' if with_orjson else 'json'))
+    print('{:>10} {:>14} {:>14} {:>9}'.format('rows', 'serializer p50', 'fast path p50', 'speedup'))
+    for result in results:
+        serializer_ms, fast_ms = result['serializer']['p50_ms'], result['fast_path']['p50_ms']
+        print('{:>10} {:>12.2f}ms {:>12.2f}ms {:>8.2f}x'.format(
+            result['rows'], serializer_ms, fast_ms, serializer_ms / fast_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Boot time, loaded modules and per-request overhead of the full and API-only profiles
+
+    python -m benchmarks.startup --runs 5 --requests 2000
+
+Every run boots a fresh interpreter the way a gunicorn worker without
+preload does: import the WSGI module (Django setup, URLconf and views), then
+send requests straight to the WSGI callable. An unauthenticated GET /users/
+(401) goes through every middleware, authentication and the view dispatch;
+a request for an unknown path (404) through the middleware and the resolver.
+No database is touched.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import summarize
+
+PROFILES = (('full', '0'), ('api', '1'))
+
+
+def child(requests):
+    from wsgiref.util import setup_testing_defaults
+
+    started = time.perf_counter()
+    from undefined_api.wsgi import application
+    boot = time.perf_counter() - started
+
+    def call(path):
+        environ = {'PATH_INFO': path, 'HTTP_HOST': 'localhost'}
+        setup_testing_defaults(environ)
+        statuses = []
+        response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        b''.join(response)
+        response.close()
+        return statuses[0]
+
+    started = time.perf_counter()
+    status = call('/users/')
+    first = time.perf_counter() - started
+    samples = {}
+    for path in ('/users/', '/missing/'):
+        samples[path] = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            call(path)
+            samples[path].append(time.perf_counter() - started)
+    from django.conf import settings
+    return {
+        'boot': boot,
+        'first': first,
+        'status': status,
+        'modules': len(sys.modules),
+        'middleware': len(settings.MIDDLEWARE),
+        'apps': len(settings.INSTALLED_APPS),
+        'users': summarize(samples['/users/']),
+        'missing': summarize(samples['/missing/']),
+    }
+
+
+def run(api_only, requests):
+    env = dict(os.environ, DJANGO_API_ONLY=api_only, DJANGO_SETTINGS_MODULE='undefined_api.settings')
+    env.setdefault('DJANGO_PROFILE', 'bench')
+    output = subprocess.check_output(
+        [sys.executable, '-m', 'benchmarks.startup', '--child', '--requests', str(requests)], env=env)
+    return json.loads(output.decode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='interpreters booted per profile')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per path and run')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.requests)))
+        return
+
+    print('{:>7} {:>5} {:>10} {:>8} {:>10} {:>10} {:>12} {:>12}'.format(
+        'profile', 'apps', 'middleware', 'modules', 'boot p50', 'first req', 'GET /users/', '404'))
+    for name, api_only in PROFILES:
+        results = [run(api_only, args.requests) for _ in range(args.runs)]
+        result = results[0]
+        print('{:>7} {:>5} {:>10} {:>8} {:>8.1f}ms {:>8.2f}ms {:>10.3f}ms {:>10.3f}ms'.format(
+            name, result['apps'], result['middleware'], result['modules'],
+            summarize([run['boot'] for run in results])['p50_ms'],
+            summarize([run['first'] for run in results])['p50_ms'],
+            sum(run['users']['mean_ms'] for run in results) / len(results),
+            sum(run['missing']['mean_ms'] for run in results) / len(results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+"""
+API benchmark suite with stored results and regression check
+
+    python -m benchmarks.suite --users 100000 --output results.json
+    python -m benchmarks.suite --users 100000 --baseline results.json --threshold 0.15
+    python -m benchmarks.suite --compare old.json new.json
+
+Seeds --users synthetic users, then drives list, detail, register, bulk and
+login, first in-process through the full middleware stack, then over HTTP
+against a threaded server started on a local port. Every result carries
+throughput, latency percentiles and the process' peak RSS so far, which
+only grows over the run, next to how much this scenario raised it;
+in-process results also carry the SQL queries per request. With
+--baseline the run exits with status 1 when a p95 latency grew, or a
+throughput dropped, by more than --threshold, or when a scenario has more
+errors than in the baseline.
+"""
+import argparse
+import base64
+import itertools
+import json
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+
+from benchmarks import load
+from benchmarks.common import phone_number, seed_users, setup_django, summarize, test_database
+
+SCENARIOS = ('list', 'detail', 'register', 'bulk', 'login')
+BENCH_USER = ('bench', 'Benchpwd!999')
+
+
+def peak_rss_mb():
+    """
+    :return: high-water mark of the whole process since it started, it never goes down
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _record_rss(result, peak_before):
+    peak = peak_rss_mb()
+    result['peak_rss_mb_cumulative'] = peak
+    # earlier scenarios may have set the mark higher, so 0 means "no more than before"
+    result['peak_rss_growth_mb'] = peak - peak_before
+
+
+class Workload(object):
+    """
+    Requests for each scenario against the seeded users
+    """
+
+    def __init__(self, users, page_size, bulk_size):
+        from user_api.models import UserModel
+        self.users = users
+        self.page_size = page_size
+        self.bulk_size = bulk_size
+        self.user_ids = [str(user_id) for user_id in
+                         UserModel.objects.order_by('?').values_list('user_id', flat=True)[:1000]]
+        # fresh phone numbers for registrations, past the seeded ones
+        self._next_index = itertools.count(users)
+
+    def _new_user(self):
+        index = next(self._next_index)
+        return {'name': 'new{}'.format(index), 'email': 'new{}@bench.test'.format(index),
+                'password': BENCH_USER[1], 'phone_number': phone_number(index), 'age': 30, 'gender': 'W'}
+
+    def request(self, scenario):
+        """
+        :return: (method, path, body) of one request, body is a callable for scenarios that write
+        """
+        if scenario == 'list':
+            return 'GET', '/users/?page_size={}'.format(self.page_size), None
+        if scenario == 'detail':
+            return 'GET', '/users/{}/'.format(random.choice(self.user_ids)), None
+        if scenario == 'register':
+            return 'POST', '/users/', lambda: json.dumps(self._new_user())
+        if scenario == 'bulk':
+            return 'POST', '/users/bulk/', lambda: json.dumps([self._new_user() for _ in range(self.bulk_size)])
+        if scenario == 'login':
+            return 'POST', '/sessions/', lambda: json.dumps(
+                {'name': 'user{}'.format(random.randrange(self.users)), 'password': BENCH_USER[1]})
+        raise ValueError('Unknown scenario: {}'.format(scenario))
+
+
+class QueryCounter(object):
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_in_process(workload, scenario, repeat):
+    from django.db import connection
+    from django.test import Client
+
+    credentials = base64.b64encode('{}:{}'.format(*BENCH_USER).encode('utf-8')).decode('ascii')
+    client = Client(SERVER_NAME='localhost', HTTP_AUTHORIZATION='Basic {}'.format(credentials))
+    # first request verifies the basic credentials, later ones hit the credential cache
+    client.get('/stats/')
+    counter = QueryCounter()
+    samples, errors = [], 0
+    started = time.perf_counter()
+    with connection.execute_wrapper(counter):
+        for _ in range(repeat):
+            method, path, body = workload.request(scenario)
+            request_started = time.perf_counter()
+            response = client.generic(method, path, body() if body else '', content_type='application/json')
+            samples.append(time.perf_counter() - request_started)
+            if response.status_code >= 400:
+                errors += 1
+    elapsed = time.perf_counter() - started
+
+    result = {'requests': repeat, 'errors': errors, 'throughput_rps': repeat / elapsed,
+              'queries_per_request': counter.count / repeat}
+    result.update(summarize(samples))
+    return result
+
+
+def start_server():
+    """
+    serves the application from a threaded server on a free local port
+    :return: (server, base url)
+    """
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+    server.set_app(get_wsgi_application())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, 'http://localhost:{}'.format(server.server_address[1])
+
+
+def run_http(workload, scenario, base_url, concurrency, duration):
+    # one path per scenario: the detail scenario keeps asking for the same user
+    method, path, body = workload.request(scenario)
+    result = load.run(base_url + path, concurrency, duration, method=method,
+                      user=BENCH_USER[0], password=BENCH_USER[1], body=body)
+    result.pop('url')
+    return result
+
+
+def run(args):
+    from django.conf import settings
+    from django.contrib.auth.models import User
+
+    started = time.perf_counter()
+    seed_users(0, args.users)
+    seed_seconds = time.perf_counter() - started
+    User.objects.create_user(BENCH_USER[0], password=BENCH_USER[1], is_staff=True)
+    workload = Workload(args.users, args.page_size, args.bulk_size)
+
+    results = {}
+    for scenario in args.scenarios:
+        peak_before = peak_rss_mb()
+        result = run_in_process(workload, scenario, args.bulk_repeat if scenario == 'bulk' else args.repeat)
+        _record_rss(result, peak_before)
+        results['in_process:{}'.format(scenario)] = result
+    if args.http:
+        server, base_url = start_server()
+        try:
+            for scenario in args.scenarios:
+                peak_before = peak_rss_mb()
+                result = run_http(workload, scenario, base_url, args.concurrency, args.duration)
+                _record_rss(result, peak_before)
+                results['http:{}'.format(scenario)] = result
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    return {
+        'meta': {
+            'users': args.users,
+            'seed_seconds': seed_seconds,
+            'repeat': args.repeat,
+            'bulk_repeat': args.bulk_repeat,
+            'bulk_size': args.bulk_size,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'database': settings.DATABASES['default']['ENGINE'],
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    :return: list of regression messages, empty if current is within threshold of baseline
+    """
+    regressions = []
+    for key, result in sorted(current['results'].items()):
+        old = baseline['results'].get(key)
+        if old is None:
+            continue
+        # a failing endpoint answers fast, more errors must not pass as a speedup
+        if result.get('errors', 0) > old.get('errors', 0):
+            regressions.append('{}: errors {} -> {}'.format(key, old.get('errors', 0), result.get('errors', 0)))
+        if not result.get('requests') or not old.get('requests'):
+            continue
+        if result['p95_ms'] > old['p95_ms'] * (1 + threshold):
+            regressions.append('{}: p95 {:.2f}ms -> {:.2f}ms'.format(key, old['p95_ms'], result['p95_ms']))
+        if result['throughput_rps'] < old['throughput_rps'] * (1 - threshold):
+            regressions.append('{}: throughput {:.1f} -> {:.1f} req/s'.format(
+                key, old['throughput_rps'], result['throughput_rps']))
+    return regressions
+
+
+def report(run_result):
+    print('{:>20} {:>10} {:>10} {:>10} {:>10} {:>8} {:>7} {:>9} {:>9}'.format(
+        'scenario', 'req/s', 'p50', 'p95', 'p99', 'queries', 'errors', 'rss peak', 'rss +'))
+    for key, result in run_result['results'].items():
+        if not result.get('requests'):
+            print('{:>20} no successful requests'.format(key))
+            continue
+        queries = result.get('queries_per_request')
+        print('{:>20} {:>10.1f} {:>8.2f}ms {:>8.2f}ms {:>8.2f}ms {:>8} {:>7} {:>7.0f}MB {:>7.0f}MB'.format(
+            key, result['throughput_rps'], result['p50_ms'], result['p95_ms'], result['p99_ms'],
+            '-' if queries is None else '{:.1f}'.format(queries), result['errors'],
+            result['peak_rss_mb_cumulative'], result['peak_rss_growth_mb']))
+
+
+def _load(path):
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10000, help='synthetic users seeded before the run')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), type=lambda value: value.split(','),
+                        help='comma separated subset of {}'.format(', '.join(SCENARIOS)))
+    parser.add_argument('--repeat', type=int, default=200, help='in-process requests per scenario')
+    parser.add_argument('--page-size', type=int, default=100, help='page size of the list scenario')
+    parser.add_argument('--bulk-size', type=int, default=50, help='users per bulk request')
+    parser.add_argument('--bulk-repeat', type=int, default=10,
+                        help='in-process bulk requests, each hashes --bulk-size passwords')
+    parser.add_argument('--no-http', dest='http', action='store_false', help='skip the local server runs')
+    parser.add_argument('--concurrency', type=int, default=8, help='http clients')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per http scenario')
+    parser.add_argument('--output', help='write results as json to this file')
+    parser.add_argument('--baseline', help='results file to check this run against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='tolerated relative regression')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='only compare two results files')
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, current = _load(args.compare[0]), _load(args.compare[1])
+    else:
+        unknown = set(args.scenarios) - set(SCENARIOS)
+        if unknown:
+            parser.error('unknown scenario(s): {}'.format(', '.join(sorted(unknown))))
+        baseline = _load(args.baseline) if args.baseline else None
+        setup_django()
+        with test_database():
+            current = run(args)
+        if args.output:
+            with open(args.output, 'w') as results_file:
+                json.dump(current, results_file, indent=2, sort_keys=True)
+
+    report(current)
+    if baseline is None:
+        return
+    regressions = compare(baseline, current, args.threshold)
+    for regression in regressions:
+        print('REGRESSION {}'.format(regression))
+    if regressions:
+        sys.exit(1)
+    print('no regression beyond {:.0%}'.format(args.threshold))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Registration validators, current implementation against the original one
+
+    python -m benchmarks.validators --number 200000
+
+The original implementations are kept below verbatim for comparison.
+"""
+import argparse
+import timeit
+
+from benchmarks.common import setup_django
+
+
+class LegacyPasswordValidator(object):
+    def __call__(self, value):
+        if len(value) < 8:
+            return 'Password must be at least 8 characters long'
+        if not any(char.isdigit() for char in value):
+            return 'Password must contain number(s)'
+        if value.lower() == value:
+            return 'Password must contain uppercase(s)'
+
+
+class LegacyPhoneNumberValidator(object):
+    def __call__(self, value):
+        _split_number = value.split('-')
+        if len(_split_number) != 3:
+            return 'Invalid phone number'
+        elif _split_number[0] != '010' or len(_split_number[1]) != 4 or len(_split_number[2]) != 4:
+            return 'Invalid phone number'
+
+
+class LegacyGenderValidator(object):
+    def __call__(self, value):
+        if value != 'M' and value != 'W':
+            return 'Invalid gender'
+
+
+CASES = {
+    'password': ['Test1234', 'averylongpasswordwithoutanything', 'Sup3rSecretPassw0rd!', 'short'],
+    'phone_number': ['010-1234-5678', '011-1234-5678', '01012345678'],
+    'gender': ['M', 'W', 'X'],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=200000, help='values per measurement')
+    args = parser.parse_args()
+
+    setup_django()
+    from user_api.validators import GenderValidator, PasswordValidator, PhoneNumberValidator
+
+    pairs = {
+        'password': (LegacyPasswordValidator(), PasswordValidator()),
+        'phone_number': (LegacyPhoneNumberValidator(), PhoneNumberValidator()),
+        'gender': (LegacyGenderValidator(), GenderValidator()),
+    }
+    print('{:>14} {:>12} {:>12} {:>12} {:>9}'.format('field', 'legacy', 'check', 'check_many', 'speedup'))
+    for field, (legacy, current) in pairs.items():
+        values = (CASES[field] * (args.number // len(CASES[field]) + 1))[:args.number]
+        for value in CASES[field]:
+            assert legacy(value) == current.check(value), (field, value)
+        legacy_s = timeit.timeit(lambda: [legacy(value) for value in values], number=1)
+        check_s = timeit.timeit(lambda: [current.check(value) for value in values], number=1)
+        batch_s = timeit.timeit(lambda: current.check_many(values), number=1)
+        print('{:>14} {:>10.1f}ms {:>10.1f}ms {:>10.1f}ms {:>8.2f}x'.format(
+            field, legacy_s * 1000, check_s * 1000, batch_s * 1000, legacy_s / min(check_s, batch_s)))
+
+
+if __name__ == '__main__':
+    main()
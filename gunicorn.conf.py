@@ -0,0 +1,30 @@
+"""
+gunicorn settings, see the Procfile
+
+    gunicorn undefined_api.wsgi -c gunicorn.conf.py
+
+GUNICORN_PRELOAD (default on) loads Django, the URLconf and every view in the
+master before forking, so workers start ready and share those pages instead of
+importing everything again on their first request. WEB_CONCURRENCY and
+GUNICORN_TIMEOUT are read as usual.
+"""
+import gc
+
+from undefined_api.env import env_bool, env_int
+
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+workers = env_int('WEB_CONCURRENCY', 2)
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from user_api.db.backends.mixins import close_all_connections
+
+    # a connection opened while loading must not be shared by the forked workers, pooled ones included
+    close_all_connections()
+    # objects allocated so far live for the whole process; frozen, the collector
+    # skips them and leaves their pages untouched, so copy-on-write keeps them shared
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
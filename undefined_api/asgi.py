@@ -0,0 +1,192 @@
+"""
+ASGI config for undefined_api project.
+
+It exposes the ASGI callable as a module-level variable named ``application``,
+e.g. ``uvicorn undefined_api.asgi:application``.
+
+Django 2.0 has no ASGI handler, async views or async ORM, so the WSGI
+application is served from a bounded thread pool: the event loop receives
+request bodies, and each request runs - views, queries and the password
+hasher included - on one pool thread. A buffered response is handed back to
+the event loop, which sends it, so a slow reader holds a cheap coroutine
+instead of a thread. Streaming responses (the user exports) query batch
+by batch as they are sent, so they are sent from their pool thread, which
+stays busy until the client has read the last chunk. ASGI_THREADS sets the
+pool size, ASGI_BODY_BUFFER how much of a request body is read before
+dispatching; larger bodies are streamed to the view.
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "undefined_api.settings")
+
+
+class RequestBody(object):
+    """
+    wsgi.input which pulls the rest of a request body from the event loop on demand
+    """
+
+    def __init__(self, body, more_body, receive, loop):
+        self._buffer = body
+        self._more_body = more_body
+        self._receive = receive
+        self._loop = loop
+
+    def _fill(self):
+        message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+        if message['type'] == 'http.disconnect':
+            self._more_body = False
+            return
+        self._buffer += message.get('body', b'')
+        self._more_body = message.get('more_body', False)
+
+    def read(self, size=-1):
+        while self._more_body and (size is None or size < 0 or len(self._buffer) < size):
+            self._fill()
+        if size is None or size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, size=-1):
+        while self._more_body and b'\n' not in self._buffer:
+            self._fill()
+        end = self._buffer.find(b'\n') + 1 or len(self._buffer)
+        if size is not None and size >= 0:
+            end = min(end, size)
+        data, self._buffer = self._buffer[:end], self._buffer[end:]
+        return data
+
+
+def build_environ(scope, body):
+    """
+    translates an ASGI http scope into a WSGI environ
+    """
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_{}'.format(name.upper().replace('-', '_'))
+        value = value.decode('latin1')
+        environ[key] = '{},{}'.format(environ[key], value) if key in environ else value
+    return environ
+
+
+class ASGIHandler(object):
+    """
+    ASGI 3 application running a WSGI application on a bounded thread pool
+    """
+
+    def __init__(self, wsgi_application, max_workers, body_buffer_size):
+        self._wsgi_application = wsgi_application
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._body_buffer_size = body_buffer_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError('Unsupported scope type: {}'.format(scope['type']))
+
+        body, more_body = b'', True
+        while more_body and len(body) < self._body_buffer_size:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+        loop = asyncio.get_event_loop()
+        request_body = RequestBody(body, more_body, receive, loop)
+        buffered = await loop.run_in_executor(self._executor, self._handle, scope, request_body, send, loop)
+        if buffered is not None:
+            response_start, content = buffered
+            await send(response_start)
+            await send({'type': 'http.response.body', 'body': content, 'more_body': False})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self._executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _handle(self, scope, request_body, send, loop):
+        """
+        runs one request on a pool thread, so thread-bound database connections
+        and cursors never change threads
+        :return: (response start message, body) for a buffered response, left to the event loop to send,
+                 None for a streaming response, which was sent from this thread
+        """
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response_start = {}
+
+        def start_response(status, headers, exc_info=None):
+            response_start.update({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+            })
+
+        result = self._wsgi_application(build_environ(scope, request_body), start_response)
+        if not getattr(result, 'streaming', True):
+            # closing fires request_finished, which releases this thread's connection
+            try:
+                return response_start, b''.join(result)
+            finally:
+                result.close()
+        try:
+            started = False
+            for chunk in result:
+                if not started:
+                    send_sync(response_start)
+                    started = True
+                if chunk:
+                    send_sync({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not started:
+                send_sync(response_start)
+            send_sync({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+
+application = ASGIHandler(
+    get_wsgi_application(),
+    max_workers=int(os.environ.get('ASGI_THREADS', 32)),
+    body_buffer_size=int(os.environ.get('ASGI_BODY_BUFFER', 1024 * 1024)),
+)
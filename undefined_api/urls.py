@@ -13,11 +13,18 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
 
 urlpatterns = [
-    path('admin/', admin.site.urls, name='admin'),
-    path('api-auth/', include('rest_framework.urls')),
     path('', include('user_api.urls'), name='users'),
 ]
+
+# the admin and the browsable API login need the apps the API-only profile leaves out
+if not settings.API_ONLY:
+    from django.contrib import admin
+
+    urlpatterns = [
+        path('admin/', admin.site.urls, name='admin'),
+        path('api-auth/', include('rest_framework.urls')),
+    ] + urlpatterns
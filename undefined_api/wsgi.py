@@ -10,7 +10,19 @@ https://docs.djangoproject.com/en/2.0/howto/deployment/wsgi/
 import os
 
 from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "undefined_api.settings")
 
 application = get_wsgi_application()
+
+# resolving the URLconf imports every view now instead of on the first request; with
+# gunicorn's preload_app this happens once in the master and the workers share the pages
+get_resolver().url_patterns
+
+# the phone number index is built at startup too, loaded lazily if the database is not ready yet
+from user_api.db.backends.mixins import close_all_connections  # noqa: E402
+from user_api.phone_index import phone_number_index  # noqa: E402
+if phone_number_index.enabled:
+    phone_number_index.load()
+    close_all_connections()
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class UserApiConfig(AppConfig):
     name = 'user_api'
+
+    def ready(self):
+        from user_api import signals  # noqa: F401
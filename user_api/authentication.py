@@ -0,0 +1,100 @@
+import hashlib
+import hmac
+from django.conf import settings
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, BasicAuthentication, get_authorization_header
+from user_api.cache import TTLCache
+from user_api.tokens import InvalidToken, token_signer
+
+credential_cache = TTLCache(
+    max_entries=getattr(settings, 'AUTH_CACHE_MAX_ENTRIES', 1024),
+    ttl=getattr(settings, 'AUTH_CACHE_TTL', 5),
+)
+
+
+def credential_key(userid, password):
+    """
+    keyed digest of a credential pair, so raw secrets never sit in memory as keys
+    :return: bytes digest
+    """
+    message = '{}\0{}'.format(userid, password).encode('utf-8')
+    return hmac.new(settings.SECRET_KEY.encode('utf-8'), message, hashlib.sha256).digest()
+
+
+def invalidate_user(user_pk):
+    """
+    forgets every cached credential belonging to user
+    """
+    credential_cache.delete_where(lambda user: user.pk == user_pk)
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """
+    HTTP Basic authentication that remembers recently verified credentials
+
+    Repeated calls from the same client skip the password hasher and the
+    auth_user query. Entries expire after AUTH_CACHE_TTL seconds and are
+    dropped as soon as the user is saved or deleted (see user_api.signals),
+    in this process only: other workers keep accepting what they cached,
+    a changed password or a deactivated user included, for up to
+    AUTH_CACHE_TTL seconds. Failed attempts are never cached.
+    """
+
+    def authenticate_credentials(self, userid, password, request=None):
+        key = credential_key(userid, password)
+        user = credential_cache.get(key)
+        if user is not None:
+            return (user, None)
+
+        user, auth = super(CachedBasicAuthentication, self).authenticate_credentials(
+            userid, password, request)
+        credential_cache.set(key, user)
+        return (user, auth)
+
+
+class TokenUser(object):
+    """
+    The user who logged in, as described by a verified session token, built without a query
+
+    Users of the API hold no admin rights, so a TokenUser never passes
+    IsAdminUser; see user_api.permissions for what it may do.
+    """
+    is_active = True
+    is_anonymous = False
+    is_authenticated = True
+    is_staff = False
+    is_superuser = False
+
+    def __init__(self, session_token):
+        self.pk = self.id = self.user_id = session_token.user_id
+
+    def __str__(self):
+        return 'TokenUser {}'.format(self.pk)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    `Authorization: Bearer <token>` with tokens issued by POST /sessions/
+
+    Verification is an HMAC and a revocation set lookup, no database access
+    and no password hash. request.user is a TokenUser standing for the user
+    who logged in, request.auth the SessionToken.
+    """
+    keyword = b'bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword:
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        if token_signer is None:
+            raise exceptions.AuthenticationFailed('Session tokens are disabled.')
+        try:
+            session_token = token_signer.verify(auth[1].decode('ascii'))
+        except (InvalidToken, UnicodeError) as error:
+            raise exceptions.AuthenticationFailed(str(error) if isinstance(error, InvalidToken) else 'Invalid token.')
+        return (TokenUser(session_token), session_token)
+
+    def authenticate_header(self, request):
+        return 'Bearer'
@@ -0,0 +1,105 @@
+from itertools import islice
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.validators import UniqueValidator
+from user_api.models import UserModel
+from user_api.phone_index import phone_number_conflict, phone_number_index, phone_number_key
+from user_api.serializers import BulkUserCreateSerializer
+from user_api.stats import record_created
+
+UNIQUE_PHONE_NUMBER_ERROR = {'phone_number': [str(UniqueValidator.message)]}
+
+
+def _created(index, user):
+    return {'index': index, 'status': status.HTTP_201_CREATED, 'user_id': str(user.user_id)}
+
+
+def _failed(index, errors):
+    return {'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'errors': errors}
+
+
+def _build_user(validated_data):
+    user = UserModel(**validated_data)
+    user.set_password(validated_data['password'])
+    user.populate_login_key()
+    return user
+
+
+def _insert(pending, results, offset):
+    """
+    inserts pending (position, user) pairs with one bulk_create,
+    falling back to row by row inserts if a concurrent writer took a phone number;
+    any other constraint failure is raised
+    """
+    try:
+        with transaction.atomic():
+            UserModel.objects.bulk_create([user for _, user in pending])
+            record_created([user for _, user in pending])
+            phone_number_index.add_many(user.phone_number for _, user in pending)
+    except IntegrityError:
+        for position, user in pending:
+            try:
+                with transaction.atomic():
+                    UserModel.objects.bulk_create([user])
+                    record_created([user])
+                    phone_number_index.add(user.phone_number)
+            except IntegrityError:
+                if not phone_number_conflict(user.phone_number):
+                    raise
+                results[position] = _failed(offset + position, UNIQUE_PHONE_NUMBER_ERROR)
+            else:
+                results[position] = _created(offset + position, user)
+    else:
+        for position, user in pending:
+            results[position] = _created(offset + position, user)
+
+
+def _create_chunk(chunk, offset, seen_phone_numbers):
+    results = [None] * len(chunk)
+
+    valid = []
+    for position, item in enumerate(chunk):
+        serializer = BulkUserCreateSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((position, serializer.validated_data))
+        else:
+            results[position] = _failed(offset + position, serializer.errors)
+
+    # only the numbers the index may hold are looked up
+    candidates = [data['phone_number'] for _, data in valid if phone_number_index.might_exist(data['phone_number'])]
+    taken = set(UserModel.objects.filter(
+        phone_number__in=candidates
+    ).values_list('phone_number', flat=True)) if candidates else set()
+    phone_number_index.record_false_positives(sum(
+        1 for phone_number in candidates if phone_number not in taken and phone_number_key(phone_number) is not None))
+
+    pending = []
+    for position, data in valid:
+        phone_number = data['phone_number']
+        if phone_number in taken or phone_number in seen_phone_numbers:
+            results[position] = _failed(offset + position, UNIQUE_PHONE_NUMBER_ERROR)
+            continue
+        seen_phone_numbers.add(phone_number)
+        pending.append((position, _build_user(data)))
+
+    if pending:
+        _insert(pending, results, offset)
+    return results
+
+
+def create_users(items, chunk_size):
+    """
+    validates and inserts users chunk by chunk
+    each chunk costs one uniqueness query and one bulk insert
+    :param items: iterable of user dicts, may be a lazy stream
+    :param chunk_size: rows validated and inserted together
+    :return: list of per-item results in input order
+    """
+    results = []
+    seen_phone_numbers = set()
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return results
+        results.extend(_create_chunk(chunk, len(results), seen_phone_numbers))
@@ -0,0 +1,200 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache(object):
+    """
+    Bounded in-process LRU cache whose entries also expire after `ttl` seconds
+    """
+
+    def __init__(self, max_entries, ttl):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """
+        looks up key, dropping it if it has expired
+        :return: cached value, or default on miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys):
+        """
+        :return: dict of the keys found, like Django's cache.get_many
+        """
+        missing = object()
+        found = {}
+        for key in keys:
+            value = self.get(key, missing)
+            if value is not missing:
+                found[key] = value
+        return found
+
+    def set(self, key, value, ttl=None):
+        """
+        stores value, evicting the least recently used entries when full
+        """
+        expires_at = time.monotonic() + (self._ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_many(self, mapping, ttl=None):
+        for key, value in mapping.items():
+            self.set(key, value, ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate):
+        """
+        drops every entry whose value satisfies predicate
+        """
+        with self._lock:
+            stale = [key for key, (value, _) in self._entries.items() if predicate(value)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        :return: dict of counters, for sizing the cache
+        """
+        return {
+            'entries': len(self._entries),
+            'max_entries': self._max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class UserDetailCache(object):
+    """
+    Rendered GET /users/<uuid>/ responses, keyed by user_id
+    Entries are (etag, last modified timestamp, json body) tuples.
+
+    `backend` is anything with get/set/delete in the shape of Django's cache
+    API: a TTLCache for a per-process LRU, or one of settings.CACHES to share
+    entries between workers. Unknown ids are remembered as MISSING for
+    `negative_timeout` seconds.
+    """
+    MISSING = b''
+
+    def __init__(self, backend, timeout, negative_timeout):
+        self._backend = backend
+        self._timeout = timeout
+        self._negative_timeout = negative_timeout
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(user_id):
+        return 'user_api:user:{}'.format(user_id)
+
+    def get(self, user_id):
+        """
+        :return: cached entry, MISSING for a cached 404, None on miss
+        """
+        entry = self._backend.get(self._key(user_id))
+        if entry is None:
+            self.misses += 1
+        elif entry == self.MISSING:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def get_many(self, user_ids):
+        """
+        looks up user_ids with one backend round-trip
+        :return: dict of user_id -> cached entry or MISSING, for the ids found
+        """
+        keys = {self._key(user_id): user_id for user_id in user_ids}
+        entries = {keys[key]: entry for key, entry in self._backend.get_many(list(keys)).items()}
+        negative = sum(1 for entry in entries.values() if entry == self.MISSING)
+        self.negative_hits += negative
+        self.hits += len(entries) - negative
+        self.misses += len(keys) - len(entries)
+        return entries
+
+    def set(self, user_id, entry):
+        self._backend.set(self._key(user_id), entry, self._timeout)
+
+    def set_many(self, entries):
+        """
+        :param entries: dict of user_id -> entry
+        """
+        self._backend.set_many({self._key(user_id): entry for user_id, entry in entries.items()}, self._timeout)
+
+    def set_missing(self, user_id):
+        self._backend.set(self._key(user_id), self.MISSING, self._negative_timeout)
+
+    def invalidate(self, user_id):
+        self.invalidations += 1
+        self._backend.delete(self._key(user_id))
+
+    def clear(self):
+        self._backend.clear()
+
+    def stats(self):
+        stats = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'negative_hits': self.negative_hits,
+            'invalidations': self.invalidations,
+        }
+        if isinstance(self._backend, TTLCache):
+            backend_stats = self._backend.stats()
+            stats.update(entries=backend_stats['entries'], max_entries=backend_stats['max_entries'],
+                         evictions=backend_stats['evictions'])
+        return stats
+
+
+def _build_user_detail_cache():
+    from django.conf import settings
+    from django.core.cache import caches
+
+    options = getattr(settings, 'USER_DETAIL_CACHE', {})
+    alias = options.get('ALIAS')
+    # invalidations only reach the process that wrote, other workers serve what they hold until it expires
+    shared = alias and not settings.CACHES[alias]['BACKEND'].endswith('.LocMemCache')
+    timeout = options.get('TIMEOUT', 300) if shared else options.get('LOCAL_TIMEOUT', 5)
+    if alias:
+        backend = caches[alias]
+    else:
+        backend = TTLCache(max_entries=options.get('MAX_ENTRIES', 10000), ttl=timeout)
+    return UserDetailCache(backend, timeout=timeout, negative_timeout=options.get('NEGATIVE_TIMEOUT', 5))
+
+
+user_detail_cache = _build_user_detail_cache()
@@ -0,0 +1,316 @@
+import itertools
+import threading
+import time
+import zlib
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from user_api.instrumentation import timed, view_label
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# media types worth compressing, by prefix; images and archives are compressed already
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'application/msgpack', 'application/cbor', 'text/')
+
+
+class GzipCompressor(object):
+    """
+    gzip stream, always available
+    """
+    encoding = 'gzip'
+
+    def __init__(self, level):
+        self._zlib = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._zlib.compress(data)
+
+    def flush(self):
+        """
+        ends the current block, so the client can decode everything sent so far
+        """
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor(object):
+    """
+    brotli stream, needs the optional `brotli` package
+    """
+    encoding = 'br'
+
+    def __init__(self, level):
+        self._brotli = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._brotli.process(data)
+
+    def flush(self):
+        return self._brotli.flush()
+
+    def finish(self):
+        return self._brotli.finish()
+
+
+class ZstdCompressor(object):
+    """
+    zstd stream, needs the optional `zstandard` package
+    """
+    encoding = 'zstd'
+
+    def __init__(self, level):
+        self._zstd = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._zstd.compress(data)
+
+    def flush(self):
+        return self._zstd.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._zstd.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+# compressors whose library is installed, by content coding
+COMPRESSORS = {compressor.encoding: compressor for compressor, module in (
+    (GzipCompressor, zlib), (BrotliCompressor, brotli), (ZstdCompressor, zstandard)) if module is not None}
+
+DEFAULT_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+
+
+def compress(data, encoding, level=None):
+    """
+    :return: data compressed as one complete stream
+    """
+    compressor = COMPRESSORS[encoding](DEFAULT_LEVELS[encoding] if level is None else level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def parse_accept_encoding(header):
+    """
+    :param header: Accept-Encoding value, e.g. "br;q=1.0, gzip;q=0.8, *;q=0"
+    :return: dict of content coding to q value
+    """
+    codings = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding] = quality
+    return codings
+
+
+def negotiate(header, encodings):
+    """
+    :param header: Accept-Encoding value
+    :param encodings: content codings offered, most preferred first
+    :return: coding with the highest q value, the earlier one on ties; None to send the body as is
+    """
+    codings = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = codings.get(encoding, codings.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMetrics(object):
+    """
+    Responses, bytes in and out and CPU time of compression, per view and content coding
+
+    Every compressed response is counted: counting is a few additions next
+    to the compression itself.
+    """
+    counters = (
+        ('responses', 'user_api_compressed_responses_total', 'Responses sent compressed'),
+        ('bytes_in', 'user_api_compression_input_bytes_total', 'Body bytes before compression'),
+        ('bytes_out', 'user_api_compression_output_bytes_total', 'Body bytes after compression'),
+        ('seconds', 'user_api_compression_seconds_total', 'Time spent compressing'),
+    )
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, encoding, bytes_in, bytes_out, seconds):
+        with self._lock:
+            series = self._series.get((view, encoding))
+            if series is None:
+                series = self._series[(view, encoding)] = {'responses': 0, 'bytes_in': 0, 'bytes_out': 0,
+                                                           'seconds': 0.0}
+            series['responses'] += 1
+            series['bytes_in'] += bytes_in
+            series['bytes_out'] += bytes_out
+            series['seconds'] += seconds
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def _snapshot(self):
+        with self._lock:
+            return sorted((key, dict(series)) for key, series in self._series.items())
+
+    def stats(self):
+        """
+        :return: {view: {encoding: counters}}, with the share of bytes saved
+                 and the compression time per MB saved
+        """
+        stats = {}
+        for (view, encoding), series in self._snapshot():
+            saved = series['bytes_in'] - series['bytes_out']
+            series['saved_ratio'] = round(saved / series['bytes_in'], 4) if series['bytes_in'] else 0.0
+            series['ms_per_mb_saved'] = round(series['seconds'] * 1000 / (saved / 1048576), 3) if saved > 0 else None
+            stats.setdefault(view, {})[encoding] = series
+        return stats
+
+    def exposition(self):
+        """
+        :return: list of lines in the Prometheus text format
+        """
+        snapshot = self._snapshot()
+        lines = []
+        for key, name, help_text in self.counters:
+            lines.extend(['# HELP {} {}'.format(name, help_text), '# TYPE {} counter'.format(name)])
+            for (view, encoding), series in snapshot:
+                lines.append('{}{{view="{}",encoding="{}"}} {}'.format(name, view, encoding, series[key]))
+        return lines
+
+
+compression_metrics = CompressionMetrics()
+
+
+def _peek(content, size):
+    """
+    reads chunks of content until they hold at least size bytes
+    :return: (chunks read, remaining iterator, True if content ended before size)
+    """
+    content = iter(content)
+    head, read = [], 0
+    for chunk in content:
+        head.append(chunk)
+        read += len(chunk)
+        if read >= size:
+            return head, content, False
+    return head, content, True
+
+
+def _compress_stream(content, compressor, flush_size, view):
+    """
+    compresses chunk by chunk, flushing once flush_size input bytes are pending
+    so memory stays bounded and the client keeps receiving data
+    :return: generator of compressed chunks
+    """
+    bytes_in = bytes_out = pending = 0
+    seconds = 0.0
+    try:
+        for chunk in content:
+            started = time.perf_counter()
+            output = compressor.compress(chunk)
+            pending += len(chunk)
+            if pending >= flush_size:
+                output += compressor.flush()
+                pending = 0
+            seconds += time.perf_counter() - started
+            bytes_in += len(chunk)
+            if output:
+                bytes_out += len(output)
+                yield output
+        started = time.perf_counter()
+        output = compressor.finish()
+        seconds += time.perf_counter() - started
+        bytes_out += len(output)
+        yield output
+    finally:
+        compression_metrics.record(view, compressor.encoding, bytes_in, bytes_out, seconds)
+
+
+class CompressionMiddleware(object):
+    """
+    Compresses API responses with the preferred coding the client accepts
+
+    Bodies under MIN_SIZE are sent as they are, compressing them costs more
+    than the bytes it saves. A streamed body is compressed chunk by chunk and
+    flushed every STREAM_FLUSH_SIZE input bytes, so it is never held whole;
+    only its first MIN_SIZE bytes are read ahead, to leave short streams alone.
+    Compressed responses get a weak ETag, they are not byte-identical to the
+    tagged representation.
+
+    Settings: COMPRESSION['ENCODINGS'] (most preferred first), COMPRESSION['MIN_SIZE'],
+    COMPRESSION['LEVELS'] per coding, COMPRESSION['STREAM_FLUSH_SIZE']
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        options = getattr(settings, 'COMPRESSION', {})
+        self.encodings = [encoding for encoding in options.get('ENCODINGS', ('zstd', 'br', 'gzip'))
+                          if encoding in COMPRESSORS]
+        self.min_size = options.get('MIN_SIZE', 1024)
+        self.levels = dict(DEFAULT_LEVELS, **options.get('LEVELS', {}))
+        self.flush_size = options.get('STREAM_FLUSH_SIZE', 65536)
+
+    def _compressible(self, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        return (not response.has_header('Content-Encoding') and
+                any(content_type.startswith(prefix) for prefix in COMPRESSIBLE_TYPES))
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.encodings or not self._compressible(response):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding', ))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        if encoding is None:
+            return response
+        compressor = COMPRESSORS[encoding](self.levels[encoding])
+        match = request.resolver_match
+        view = view_label(match.func, request.method) if match is not None else 'unresolved'
+
+        if response.streaming:
+            head, rest, ended = _peek(response.streaming_content, self.min_size)
+            if ended:
+                response.streaming_content = head
+                return response
+            response.streaming_content = _compress_stream(
+                itertools.chain(head, rest), compressor, self.flush_size, view)
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            content = response.content
+            with timed('compress'):
+                started = time.perf_counter()
+                compressed = compressor.compress(content) + compressor.finish()
+                seconds = time.perf_counter() - started
+            if len(compressed) >= len(content):
+                return response
+            compression_metrics.record(view, encoding, len(content), len(compressed), seconds)
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag', '')
+        if etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,73 @@
+import hashlib
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+# bump whenever the rendered user representation changes, so old ETags stop matching
+REPRESENTATION_VERSION = 1
+
+
+def _timestamp(updated_at):
+    return int(updated_at.timestamp() * 1000000)
+
+
+def _variant_tag(variant):
+    return '-' + hashlib.md5(variant.encode('utf-8')).hexdigest()[:8] if variant else ''
+
+
+def user_etag(user_id, updated_at, variant=''):
+    """
+    strong ETag of a single user, derived from its row version alone
+    :param variant: negotiated format and field selection, '' for the default json
+    :return: quoted ETag
+    """
+    return '"u{}-{}-{}{}"'.format(REPRESENTATION_VERSION, user_id.hex, _timestamp(updated_at), _variant_tag(variant))
+
+
+def page_etag(versions, query_string, links, variant=''):
+    """
+    strong ETag of a page of users
+    :param versions: (user_id, updated_at) of the users on the page, in page order
+    :param query_string: raw query string, so different page sizes never share a tag
+    :param links: (next, previous) links of the page, a row added after a full last page changes next
+    :param variant: negotiated format, '' for the default json
+    :return: quoted ETag
+    """
+    digest = hashlib.md5('{}|{}|{}|{}'.format(REPRESENTATION_VERSION, query_string, *links).encode('utf-8'))
+    if variant:
+        digest.update(variant.encode('utf-8'))
+    for user_id, updated_at in versions:
+        digest.update(user_id.bytes)
+        digest.update(_timestamp(updated_at).to_bytes(8, 'big', signed=True))
+    return '"p{}"'.format(digest.hexdigest())
+
+
+def last_modified(updated_ats):
+    """
+    :return: newest of updated_ats as an epoch timestamp, None if empty
+    """
+    updated_ats = list(updated_ats)
+    return int(max(updated_ats).timestamp()) if updated_ats else None
+
+
+def is_conditional(request):
+    """
+    :return: True if request carries If-None-Match or If-Modified-Since
+    """
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def not_modified(request, etag, modified):
+    """
+    evaluates If-None-Match / If-Modified-Since
+    :return: 304 response if the client copy is current, None otherwise
+    """
+    return get_conditional_response(request, etag=etag, last_modified=modified)
+
+
+def set_validators(response, etag, modified):
+    # the tags depend on the negotiated format
+    patch_vary_headers(response, ('Accept', ))
+    response['ETag'] = etag
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified)
+    return response
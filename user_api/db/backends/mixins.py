@@ -0,0 +1,123 @@
+import threading
+import time
+from django.db import connections
+from user_api.db.metrics import connect_metrics
+from user_api.db.pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pools():
+    """
+    :return: dict of (alias, database name) to ConnectionPool
+    """
+    with _pools_lock:
+        return dict(_pools)
+
+
+def serve_requests():
+    """
+    marks the process as a web worker: connections opened from now on get the
+    request-only settings (STATEMENT_TIMEOUT_MS), called at every request start
+    """
+    PooledDatabaseWrapperMixin.serving_requests = True
+
+
+def close_all_connections():
+    """
+    closes every connection for real: connections.close_all() hands pooled ones
+    back to their pool, so the idle ones are closed too; call before forking,
+    a socket left in a pool would be shared by every child
+    """
+    connections.close_all()
+    for pool in get_pools().values():
+        pool.close_all()
+
+
+class PooledDatabaseWrapperMixin(object):
+    """
+    Connection pooling, health checks and connect timing for a Django backend
+
+    Extra keys read from the database OPTIONS:
+        POOL: dict of MAX_SIZE, MAX_OVERFLOW, IDLE_TIMEOUT, ACQUIRE_TIMEOUT and
+              HEALTH_CHECK_INTERVAL, enables the in-process pool when present
+        HEALTH_CHECKS: ping a persistent connection at request start when it
+              sat unused for more than HEALTH_CHECK_INTERVAL seconds
+        HEALTH_CHECK_INTERVAL: defaults to 30
+        STATEMENT_TIMEOUT_MS: Postgres statement_timeout of the connections
+              opened once the process serves requests (see serve_requests),
+              so migrations and management commands are not cut off
+    With a pool, set CONN_MAX_AGE to 0 so connections go back to the pool
+    after every request instead of staying pinned to a thread.
+    """
+    _last_used = None
+    # set by serve_requests() in web processes
+    serving_requests = False
+
+    @property
+    def pool(self):
+        options = self.settings_dict['OPTIONS'].get('POOL')
+        if not options:
+            return None
+        key = (self.alias, self.settings_dict['NAME'])
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(
+                    max_size=options.get('MAX_SIZE', 10),
+                    max_overflow=options.get('MAX_OVERFLOW', 0),
+                    idle_timeout=options.get('IDLE_TIMEOUT', 300),
+                    acquire_timeout=options.get('ACQUIRE_TIMEOUT', 5),
+                    health_check_interval=options.get('HEALTH_CHECK_INTERVAL', 30),
+                )
+        return pool
+
+    def get_connection_params(self):
+        params = super(PooledDatabaseWrapperMixin, self).get_connection_params()
+        for key in ('POOL', 'HEALTH_CHECKS', 'HEALTH_CHECK_INTERVAL', 'STATEMENT_TIMEOUT_MS'):
+            params.pop(key, None)
+        return params
+
+    def init_connection_state(self):
+        super(PooledDatabaseWrapperMixin, self).init_connection_state()
+        timeout = self.settings_dict['OPTIONS'].get('STATEMENT_TIMEOUT_MS')
+        if timeout and self.serving_requests and self.vendor == 'postgresql':
+            with self.connection.cursor() as cursor:
+                cursor.execute('SET statement_timeout = %s', [int(timeout)])
+            if not self.get_autocommit():
+                self.connection.commit()
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        pool = self.pool
+        if pool is None:
+            connection = super(PooledDatabaseWrapperMixin, self).get_new_connection(conn_params)
+        else:
+            parent = super(PooledDatabaseWrapperMixin, self)
+            connection = pool.acquire(lambda: parent.get_new_connection(conn_params))
+        connect_metrics.record(time.perf_counter() - started)
+        self._last_used = time.monotonic()
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super(PooledDatabaseWrapperMixin, self)._close()
+        with self.wrap_database_errors:
+            pool.release(self.connection, reusable=not (self.in_atomic_block or self.errors_occurred))
+
+    def check_health(self):
+        """
+        drops the current connection if it went stale while idle
+        called at the start of every request when HEALTH_CHECKS is on
+        """
+        options = self.settings_dict['OPTIONS']
+        if not options.get('HEALTH_CHECKS') or self.connection is None or self.in_atomic_block:
+            return
+        now = time.monotonic()
+        idle_for = now - (self._last_used or now)
+        self._last_used = now
+        if idle_for > options.get('HEALTH_CHECK_INTERVAL', 30) and not self.is_usable():
+            self.errors_occurred = True
+            self.close()
@@ -0,0 +1,6 @@
+from django.db.backends.postgresql import base
+from user_api.db.backends.mixins import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,20 @@
+from django.db.backends.sqlite3 import base
+from user_api.db.backends.mixins import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    SQLite backend which also applies OPTIONS['PRAGMAS'], e.g.
+    {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}, to every new connection
+    """
+
+    def get_connection_params(self):
+        params = super(DatabaseWrapper, self).get_connection_params()
+        params.pop('PRAGMAS', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super(DatabaseWrapper, self).get_new_connection(conn_params)
+        for pragma, value in self.settings_dict['OPTIONS'].get('PRAGMAS', {}).items():
+            connection.execute('PRAGMA {} = {}'.format(pragma, value))
+        return connection
@@ -0,0 +1,49 @@
+import threading
+
+
+class ConnectMetrics(object):
+    """
+    Time spent acquiring database connections, per request and per process
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def start_request(self):
+        self._local.count = 0
+        self._local.seconds = 0.0
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+        self._local.count = getattr(self._local, 'count', 0) + 1
+        self._local.seconds = getattr(self._local, 'seconds', 0.0) + seconds
+
+    def request_count(self):
+        """
+        :return: connections acquired since the current request started
+        """
+        return getattr(self._local, 'count', 0)
+
+    def request_seconds(self):
+        """
+        :return: seconds spent acquiring connections since the current request started
+        """
+        return getattr(self._local, 'seconds', 0.0)
+
+    def stats(self):
+        return {
+            'acquires': self.count,
+            'total_ms': self.total_seconds * 1000,
+            'mean_ms': self.total_seconds * 1000 / self.count if self.count else 0.0,
+            'max_ms': self.max_seconds * 1000,
+        }
+
+
+connect_metrics = ConnectMetrics()
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import deque
+from django.db.utils import OperationalError
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of DB-API connections
+
+    Up to `max_size` idle connections are kept for reuse. When they are all
+    checked out, up to `max_overflow` extra connections may be opened; those
+    are closed instead of pooled on release. Beyond that, acquire() waits up
+    to `acquire_timeout` seconds for a release.
+    """
+
+    def __init__(self, max_size=10, max_overflow=0, idle_timeout=300, acquire_timeout=5,
+                 health_check_interval=30):
+        self.max_size = max_size
+        self.max_overflow = max_overflow
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._idle = deque()
+        self._open = 0
+        self._condition = threading.Condition()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.waits = 0
+        self.timeouts = 0
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_usable(connection):
+        try:
+            cursor = connection.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+        except Exception:
+            return False
+        return True
+
+    def _take_idle(self):
+        """
+        pops the most recently released usable connection, must hold the lock
+        :return: (connection, idle seconds) or None
+        """
+        now = time.monotonic()
+        while self._idle:
+            connection, released_at = self._idle.pop()
+            if now - released_at <= self.idle_timeout:
+                return connection, now - released_at
+            self._open -= 1
+            self.discarded += 1
+            self._close_quietly(connection)
+        return None
+
+    def _discard(self, connection):
+        with self._condition:
+            self._open -= 1
+            self.discarded += 1
+            self._condition.notify()
+        self._close_quietly(connection)
+
+    def acquire(self, connect):
+        """
+        hands out an idle connection, or opens one with connect()
+        idle connections older than health_check_interval are pinged first
+        :param connect: callable returning a new DB-API connection
+        :return: DB-API connection
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._condition:
+                taken = self._take_idle()
+                if taken is None:
+                    if self._open < self.max_size + self.max_overflow:
+                        self._open += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout('Timed out waiting for a database connection')
+                    self.waits += 1
+                    self._condition.wait(remaining)
+                    continue
+
+            connection, idle_for = taken
+            if idle_for < self.health_check_interval or self._is_usable(connection):
+                self.reused += 1
+                return connection
+            self._discard(connection)
+
+        try:
+            connection = connect()
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        self.created += 1
+        return connection
+
+    def release(self, connection, reusable=True):
+        """
+        returns connection to the pool, closing it if it is broken or surplus
+        """
+        if reusable:
+            try:
+                connection.rollback()
+            except Exception:
+                reusable = False
+        if not reusable:
+            self._discard(connection)
+            return
+        with self._condition:
+            if len(self._idle) < self.max_size:
+                self._idle.append((connection, time.monotonic()))
+                self._condition.notify()
+                return
+            self._open -= 1
+            self._condition.notify()
+        self._close_quietly(connection)
+
+    def close_all(self):
+        with self._condition:
+            while self._idle:
+                connection, _ = self._idle.pop()
+                self._open -= 1
+                self._close_quietly(connection)
+
+    def stats(self):
+        return {
+            'open': self._open,
+            'idle': len(self._idle),
+            'max_size': self.max_size,
+            'max_overflow': self.max_overflow,
+            'created': self.created,
+            'reused': self.reused,
+            'discarded': self.discarded,
+            'waits': self.waits,
+            'timeouts': self.timeouts,
+        }
@@ -0,0 +1,206 @@
+import hashlib
+import random
+import threading
+import time
+from contextlib import ContextDecorator
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.throttling import BaseThrottle
+from user_api.cache import TTLCache
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_local = threading.local()
+
+
+class ReplicaSet(object):
+    """
+    Weighted choice among the replica aliases that are currently healthy
+
+    A replica whose connection fails is ejected for `eject_seconds` and
+    tried again afterwards; with every replica ejected reads fall back to
+    the primary.
+    """
+
+    def __init__(self, weights, eject_seconds):
+        self.weights = dict(weights)
+        self.eject_seconds = eject_seconds
+        self._ejected_until = {}
+        self._lock = threading.Lock()
+        self.reads = dict.fromkeys(self.weights, 0)
+        self.ejections = dict.fromkeys(self.weights, 0)
+
+    def healthy(self):
+        now = time.monotonic()
+        with self._lock:
+            return [alias for alias in self.weights if self._ejected_until.get(alias, 0) <= now]
+
+    def eject(self, alias):
+        with self._lock:
+            self._ejected_until[alias] = time.monotonic() + self.eject_seconds
+            self.ejections[alias] += 1
+
+    def check(self, alias):
+        """
+        opens the connection of alias if needed; a no-op for an open one
+        :return: True if usable
+        """
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            return False
+        return True
+
+    def choose(self):
+        """
+        :return: alias of a reachable replica picked by weight, None if there is none
+        """
+        candidates = self.healthy()
+        while candidates:
+            alias = random.choices(candidates, [self.weights[alias] for alias in candidates])[0]
+            if self.check(alias):
+                with self._lock:
+                    self.reads[alias] += 1
+                return alias
+            self.eject(alias)
+            candidates.remove(alias)
+        return None
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {alias: {
+                'weight': weight,
+                'reads': self.reads[alias],
+                'ejections': self.ejections[alias],
+                'ejected': self._ejected_until.get(alias, 0) > now,
+            } for alias, weight in self.weights.items()}
+
+
+def _build_replica_set():
+    options = getattr(settings, 'DATABASE_REPLICAS', {})
+    return ReplicaSet(options.get('WEIGHTS', {}), options.get('EJECT_SECONDS', 30))
+
+
+def _build_pin_store():
+    from django.core.cache import caches
+
+    options = getattr(settings, 'DATABASE_REPLICAS', {})
+    if options.get('PIN_CACHE_ALIAS'):
+        return caches[options['PIN_CACHE_ALIAS']]
+    return TTLCache(max_entries=options.get('PIN_MAX_ENTRIES', 10000), ttl=options.get('PIN_SECONDS', 5))
+
+
+replica_set = _build_replica_set()
+pin_store = _build_pin_store()
+
+
+class replica_reads(ContextDecorator):
+    """
+    Lets the reads of the block go to a replica, unless the request is pinned to the primary
+
+    One replica is picked on the first read and kept for the rest of the
+    block, so the queries of one response see the same snapshot.
+    """
+
+    def __enter__(self):
+        # kept per thread, a decorated view shares one instance between requests
+        _local.__dict__.setdefault('outer', []).append((getattr(_local, 'replica_reads', False), current_replica()))
+        _local.replica_reads, _local.replica = True, None
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None and issubclass(exc_type, DatabaseError) and current_replica() is not None:
+            # the replica failed mid-request, keep the next requests away from it
+            replica_set.eject(_local.replica)
+        _local.replica_reads, _local.replica = _local.outer.pop()
+
+
+def current_replica():
+    """
+    :return: alias of the replica the current `replica_reads` block reads from, None for the primary
+    """
+    replica = getattr(_local, 'replica', None)
+    return None if replica == DEFAULT_DB_ALIAS else replica
+
+
+def pinned():
+    """
+    :return: True if the current request must read from the primary
+    """
+    return getattr(_local, 'pinned', False)
+
+
+class ReplicaRouter(object):
+    """
+    Sends the reads inside `replica_reads` to a replica, everything else to the primary
+
+    Writes, reads outside `replica_reads`, reads in a transaction on the
+    primary and reads of a client pinned after its own write (see
+    ReplicaPinMiddleware) use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not getattr(_local, 'replica_reads', False) or pinned() or not replica_set.weights:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if _local.replica is None:
+            _local.replica = replica_set.choose() or DEFAULT_DB_ALIAS
+        return _local.replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replica_set.weights
+
+
+def client_key(request):
+    """
+    identifies the client across requests: its credentials if any, else its address
+    """
+    ident = request.META.get('HTTP_AUTHORIZATION') or BaseThrottle().get_ident(request) or ''
+    return 'user_api:pin:{}'.format(hashlib.sha1(ident.encode('utf-8')).hexdigest())
+
+
+class ReplicaPinMiddleware(object):
+    """
+    Read-your-own-writes: a client that wrote reads from the primary for PIN_SECONDS
+
+    Replicas lag behind the primary, so without the pin a client could
+    register a user and not find it on the next request. Requests with an
+    unsafe method are pinned themselves, unless their view declares
+    `read_only = True`.
+
+    Settings: DATABASE_REPLICAS['PIN_SECONDS'], DATABASE_REPLICAS['PIN_CACHE_ALIAS'] to share pins between workers
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'DATABASE_REPLICAS', {}).get('PIN_SECONDS', 5)
+
+    def __call__(self, request):
+        if not replica_set.weights:
+            return self.get_response(request)
+        key = client_key(request)
+        _local.writes = request.method not in SAFE_METHODS
+        _local.pinned = _local.writes or pin_store.get(key) is not None
+        try:
+            response = self.get_response(request)
+            writes = _local.writes
+        finally:
+            _local.pinned = _local.writes = False
+        if writes and response.status_code < 400:
+            pin_store.set(key, True, self.pin_seconds)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if getattr(_local, 'writes', False) and getattr(view_class, 'read_only', False):
+            _local.writes = False
+            _local.pinned = pin_store.get(client_key(request)) is not None
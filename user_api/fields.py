@@ -0,0 +1,39 @@
+import uuid
+from django.db import models
+
+
+class CompactUUIDField(models.UUIDField):
+    """
+    UUIDField stored in 16 bytes everywhere
+
+    Postgres keeps its native uuid type. Django stores UUIDs as char(32) hex
+    elsewhere; this field uses binary(16) on MySQL and a blob on SQLite, which
+    halves the primary key and every secondary index entry carrying it.
+    """
+
+    def get_internal_type(self):
+        # keeps the backends' char(32) UUID converters away from our bytes
+        return 'CompactUUIDField'
+
+    def db_type(self, connection):
+        if connection.features.has_native_uuid_field:
+            return 'uuid'
+        if connection.vendor == 'mysql':
+            return 'binary(16)'
+        return 'blob'
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = self.to_python(value)
+        if connection.features.has_native_uuid_field:
+            return value
+        return value.bytes
+
+    def from_db_value(self, value, expression, connection, *args):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return uuid.UUID(bytes=bytes(value))
+        return uuid.UUID(value)
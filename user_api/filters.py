@@ -0,0 +1,45 @@
+import django_filters
+from user_api.models import MAX_AGE, UserModel
+
+
+def prefix_range(prefix):
+    """
+    smallest string greater than every string starting with prefix
+    :return: str, None if there is no such bound
+    """
+    while prefix:
+        last = ord(prefix[-1])
+        if last < 0x10ffff:
+            # skip the surrogate block, it cannot be stored
+            return prefix[:-1] + chr(0xe000 if last == 0xd7ff else last + 1)
+        prefix = prefix[:-1]
+    return None
+
+
+class UserFilter(django_filters.FilterSet):
+    """
+    Filters for the user list, each one answered from an index
+
+    name and email match a prefix. A prefix is sent as an index range
+    (`name >= 'ab' AND name < 'ac'`) next to the LIKE, since a LIKE alone
+    only uses an index on some backends and collations.
+    """
+    gender = django_filters.ChoiceFilter(choices=(('M', 'M'), ('W', 'W')))
+    # bounded so the database never sees a number it cannot bind
+    age_min = django_filters.NumberFilter(field_name='age', lookup_expr='gte', min_value=0, max_value=MAX_AGE)
+    age_max = django_filters.NumberFilter(field_name='age', lookup_expr='lte', min_value=0, max_value=MAX_AGE)
+    name = django_filters.CharFilter(method='filter_prefix')
+    email = django_filters.CharFilter(method='filter_prefix')
+
+    class Meta:
+        model = UserModel
+        fields = ('gender', 'age_min', 'age_max', 'name', 'email')
+
+    def filter_prefix(self, queryset, name, value):
+        if not value:
+            return queryset
+        lookups = {name + '__gte': value, name + '__startswith': value}
+        upper = prefix_range(value)
+        if upper is not None:
+            lookups[name + '__lt'] = upper
+        return queryset.filter(**lookups)
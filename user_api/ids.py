@@ -0,0 +1,32 @@
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7():
+    """
+    time-ordered UUID (version 7, RFC 9562)
+    48 bit unix time in ms, a 12 bit counter keeping ids generated within the
+    same millisecond in order, then 62 random bits. New primary keys land at
+    the right edge of the index instead of on random pages.
+    :return: uuid.UUID
+    """
+    global _last_ms, _counter
+    with _lock:
+        ms = int(time.time() * 1000)
+        if ms > _last_ms:
+            _last_ms = ms
+            _counter = int.from_bytes(os.urandom(2), 'big') & 0x7ff
+        else:
+            _counter += 1
+            if _counter > 0xfff:
+                _last_ms += 1
+                _counter = 0
+        ms, counter = _last_ms, _counter
+    random_bits = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    return uuid.UUID(int=(ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | random_bits)
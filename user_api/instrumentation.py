@@ -0,0 +1,244 @@
+import random
+import threading
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from rest_framework.views import APIView
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_local = threading.local()
+
+
+class Histogram(object):
+    """
+    Cumulative histogram in the Prometheus sense, one series per label value
+    """
+
+    def __init__(self, name, help_text, buckets, label='view'):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label = label
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * len(self.buckets), 0, 0.0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            series[1] += 1
+            series[2] += value
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def exposition(self):
+        """
+        :return: list of lines in the Prometheus text format
+        """
+        lines = ['# HELP {} {}'.format(self.name, self.help_text), '# TYPE {} histogram'.format(self.name)]
+        with self._lock:
+            series = sorted((label_value, list(counts), count, total)
+                            for label_value, (counts, count, total) in self._series.items())
+        for label_value, counts, count, total in series:
+            label = '{}="{}"'.format(self.label, label_value)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(self.name, label, bound, cumulative))
+            lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(self.name, label, count))
+            lines.append('{}_sum{{{}}} {}'.format(self.name, label, total))
+            lines.append('{}_count{{{}}} {}'.format(self.name, label, count))
+        return lines
+
+
+class RequestMetrics(object):
+    """
+    Histograms of sampled requests, per view
+    """
+
+    def __init__(self):
+        self.duration = Histogram('user_api_request_duration_seconds', 'Wall time of the request', DURATION_BUCKETS)
+        self.queries = Histogram('user_api_request_queries', 'SQL queries executed by the request', COUNT_BUCKETS)
+        self.db = Histogram('user_api_request_db_seconds', 'Time spent executing SQL', DURATION_BUCKETS)
+        self.serialize = Histogram('user_api_request_serialize_seconds', 'Time spent serializing and rendering',
+                                   DURATION_BUCKETS)
+        self.auth = Histogram('user_api_request_auth_seconds', 'Time spent authenticating', DURATION_BUCKETS)
+        self.response_bytes = Histogram('user_api_response_bytes', 'Size of the response body', SIZE_BUCKETS)
+
+    def histograms(self):
+        return [self.duration, self.queries, self.db, self.serialize, self.auth, self.response_bytes]
+
+    def record(self, timings, seconds):
+        view = timings.view
+        self.duration.observe(view, seconds)
+        self.queries.observe(view, timings.queries)
+        self.db.observe(view, timings.phases.get('db', 0.0))
+        self.serialize.observe(view, timings.phases.get('serialize', 0.0))
+        self.auth.observe(view, timings.phases.get('auth', 0.0))
+
+    def reset(self):
+        for histogram in self.histograms():
+            histogram.reset()
+
+    def exposition(self, sample_rate):
+        lines = ['# HELP user_api_sample_rate Share of requests that are measured',
+                 '# TYPE user_api_sample_rate gauge',
+                 'user_api_sample_rate {}'.format(sample_rate)]
+        for histogram in self.histograms():
+            lines.extend(histogram.exposition())
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
+
+
+class RequestTimings(object):
+    """
+    Phase durations of the request being handled on this thread
+    """
+
+    def __init__(self):
+        self.view = 'unresolved'
+        self.queries = 0
+        self.phases = {}
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def server_timing(self, total):
+        """
+        :return: value for the Server-Timing header, durations in milliseconds
+        """
+        entries = ['{};dur={:.3f}'.format(phase, self.phases[phase] * 1000)
+                   for phase in ('auth', 'serialize', 'compress') if phase in self.phases]
+        entries.append('db;dur={:.3f};desc="{} queries"'.format(self.phases.get('db', 0.0) * 1000, self.queries))
+        entries.append('total;dur={:.3f}'.format(total * 1000))
+        return ', '.join(entries)
+
+
+def view_label(view_func, method):
+    """
+    :return: label of a view in the metrics, e.g. "UserView.get"
+    """
+    view_class = getattr(view_func, 'view_class', None)
+    name = view_class.__name__ if view_class is not None else view_func.__name__
+    return '{}.{}'.format(name, method.lower())
+
+
+def current_timings():
+    """
+    :return: RequestTimings of the current request, None if it is not sampled
+    """
+    return getattr(_local, 'timings', None)
+
+
+class timed(object):
+    """
+    Context manager adding the duration of the block to a phase of the current request
+    costs one thread-local lookup when the request is not sampled
+    """
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.timings = current_timings()
+        if self.timings is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings.add(self.phase, time.perf_counter() - self.started)
+
+
+class QueryTimer(object):
+    """
+    Execute wrapper counting queries and SQL time into the request timings
+    """
+
+    def __init__(self, timings):
+        self.timings = timings
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.timings.queries += 1
+            self.timings.add('db', time.perf_counter() - started)
+
+
+class InstrumentedAPIView(APIView):
+    """
+    APIView reporting authentication time to the current request timings
+    """
+
+    def perform_authentication(self, request):
+        with timed('auth'):
+            super(InstrumentedAPIView, self).perform_authentication(request)
+
+
+def _count_bytes(content, view):
+    size = 0
+    for chunk in content:
+        size += len(chunk)
+        yield chunk
+    request_metrics.response_bytes.observe(view, size)
+
+
+class InstrumentationMiddleware(object):
+    """
+    Measures a sample of requests: wall time, queries, SQL, serializer and
+    auth time, and response size, recorded per view into `request_metrics`.
+    Sampled responses carry a Server-Timing header.
+
+    Settings: INSTRUMENTATION['SAMPLE_RATE'] (0 to 1), INSTRUMENTATION['SERVER_TIMING']
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        options = getattr(settings, 'INSTRUMENTATION', {})
+        self.sample_rate = options.get('SAMPLE_RATE', 0.1)
+        self.server_timing = options.get('SERVER_TIMING', True)
+
+    def __call__(self, request):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timings = _local.timings = RequestTimings()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(QueryTimer(timings)))
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+        seconds = time.perf_counter() - started
+
+        request_metrics.record(timings, seconds)
+        if response.streaming:
+            response.streaming_content = _count_bytes(response.streaming_content, timings.view)
+        else:
+            request_metrics.response_bytes.observe(timings.view, len(response.content))
+        if self.server_timing:
+            response['Server-Timing'] = timings.server_timing(seconds)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = current_timings()
+        if timings is not None:
+            timings.view = view_label(view_func, request.method)
@@ -0,0 +1,23 @@
+from django.contrib.auth.hashers import make_password
+from user_api.models import UserModel, normalize_login_name
+
+
+def find_user_by_credentials(name, password):
+    """
+    looks up user by login name and verifies password
+    one indexed query on login_key, then a hash check per candidate
+    :param name: login name as typed by the user
+    :param password: raw password
+    :return: UserModel with only `user_id` loaded, None if credentials are incorrect
+    """
+    candidates = list(UserModel.objects.filter(
+        login_key=normalize_login_name(name)).only('user_id', 'password'))
+    if not candidates:
+        # run the hasher anyway so unknown names take as long as wrong passwords
+        make_password(password)
+        return None
+
+    for candidate in candidates:
+        if candidate.check_password(password):
+            return candidate
+    return None
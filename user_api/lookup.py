@@ -0,0 +1,67 @@
+import uuid
+from user_api.cache import user_detail_cache
+from user_api.conditional import last_modified, user_etag
+from user_api.db.router import current_replica
+from user_api.instrumentation import timed
+from user_api.models import UserModel
+from user_api.representation import render_json
+from user_api.serializers import user_representation
+
+# ids per IN query, below the bound parameter limit of every backend
+IN_QUERY_SIZE = 500
+
+
+def detail_cache_entry(row):
+    """
+    renders a user row the way GET /users/<uuid>/ sends it
+    :param row: dict with user_id, updated_at and the user_representation columns
+    :return: (etag, last modified timestamp, json body) for the detail cache
+    """
+    with timed('serialize'):
+        return (user_etag(row['user_id'], row['updated_at']),
+                last_modified([row['updated_at']]),
+                render_json(user_representation.to_dict(row)))
+
+
+def parse_user_id(value):
+    """
+    :return: uuid.UUID, None if value is not a user id
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        return None
+
+
+def lookup_users(user_ids):
+    """
+    resolves user_ids from the detail cache, the rest with IN queries
+    users loaded from the primary are cached for the detail view and the next lookups
+    :param user_ids: iterable of uuid.UUID, may repeat
+    :return: dict of user_id -> json body, unknown ids are absent
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    bodies = {}
+    uncached = []
+    cached = user_detail_cache.get_many(user_ids)
+    for user_id in user_ids:
+        entry = cached.get(user_id)
+        if entry is None:
+            uncached.append(user_id)
+        elif entry != user_detail_cache.MISSING:
+            bodies[user_id] = entry[2]
+
+    for start in range(0, len(uncached), IN_QUERY_SIZE):
+        chunk = uncached[start:start + IN_QUERY_SIZE]
+        rows = UserModel.objects.filter(user_id__in=chunk).values('user_id', 'updated_at', *user_representation.columns)
+        entries = {row['user_id']: detail_cache_entry(row) for row in rows}
+        bodies.update((user_id, entry[2]) for user_id, entry in entries.items())
+        # a lagging replica may miss the latest update or the user itself, only the primary is cached
+        if current_replica() is None:
+            user_detail_cache.set_many(entries)
+            for user_id in chunk:
+                if user_id not in entries:
+                    user_detail_cache.set_missing(user_id)
+    return bodies
@@ -0,0 +1,28 @@
+import sys
+from django.core.management.base import BaseCommand
+from user_api.transfer import FORMATS, Progress, export_users
+
+
+class Command(BaseCommand):
+    """
+    Streams every user to a CSV or NDJSON file with constant memory
+    """
+    help = 'Export users as CSV or NDJSON, password hashes included'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-', help='file to write, - for stdout')
+        parser.add_argument('--format', choices=FORMATS, help='defaults to the output extension, else csv')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='rows fetched per query')
+        parser.add_argument('--progress-every', type=int, default=100000,
+                            help='rows between progress lines, 0 for none')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        export_format = options['format'] or ('ndjson' if output.endswith('.ndjson') else 'csv')
+        progress = Progress(self.stderr.write, options['progress_every'], 'Exported')
+        if output == '-':
+            export_users(sys.stdout, export_format, options['chunk_size'], progress)
+        else:
+            with open(output, 'w', encoding='utf-8', newline='') as out:
+                export_users(out, export_format, options['chunk_size'], progress)
+        self.stderr.write('Exported {} users, {:.0f} rows/s'.format(progress.rows, progress.rate()))
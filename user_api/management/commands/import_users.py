@@ -0,0 +1,40 @@
+import sys
+from django.core.management.base import BaseCommand
+from user_api.transfer import FORMATS, Progress, import_users, read_rows
+
+
+class Command(BaseCommand):
+    """
+    Loads users from a CSV or NDJSON export in batches, with constant memory
+    """
+    help = ('Import users from CSV or NDJSON. Rows are validated like registrations; password hashes '
+            'are kept, plain passwords are checked and hashed. Rows whose user_id or phone_number '
+            'exists are rejected, so an interrupted import can simply be run again.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='file to read, - for stdin')
+        parser.add_argument('--format', choices=FORMATS, help='defaults to the input extension, else csv')
+        parser.add_argument('--batch-size', type=int, default=500, help='rows validated and inserted together')
+        parser.add_argument('--progress-every', type=int, default=100000,
+                            help='rows between progress lines, 0 for none')
+        parser.add_argument('--max-errors', type=int, default=100, help='rejected rows to print')
+
+    def handle(self, *args, **options):
+        source = options['input']
+        import_format = options['format'] or ('ndjson' if source.endswith('.ndjson') else 'csv')
+        progress = Progress(self.stderr.write, options['progress_every'], 'Read')
+        printed = [0]
+
+        def on_error(line_number, message):
+            if printed[0] < options['max_errors']:
+                self.stderr.write('line {}: {}'.format(line_number, message))
+            printed[0] += 1
+
+        if source == '-':
+            imported, rejected = import_users(
+                read_rows(sys.stdin, import_format), options['batch_size'], progress, on_error)
+        else:
+            with open(source, encoding='utf-8', newline='') as stream:
+                imported, rejected = import_users(
+                    read_rows(stream, import_format), options['batch_size'], progress, on_error)
+        self.stdout.write('Imported {} users, rejected {}, {:.0f} rows/s'.format(imported, rejected, progress.rate()))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from user_api import stats
+
+
+class Command(BaseCommand):
+    """
+    Recounts the user statistics behind users/stats/ from the user table
+    """
+    help = 'Recount users per gender and age band for users/stats/'
+
+    def handle(self, *args, **options):
+        total = stats.rebuild()
+        self.stdout.write('Counted {} users'.format(total))
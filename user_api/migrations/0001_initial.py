@@ -0,0 +1,27 @@
+# Generated by Django 2.0 on 2026-10-18 11:41
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserModel',
+            fields=[
+                ('user_id', models.UUIDField(default=uuid.uuid1, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=50)),
+                ('email', models.EmailField(max_length=254)),
+                ('password', models.CharField(max_length=100)),
+                ('phone_number', models.CharField(max_length=13, unique=True)),
+                ('age', models.PositiveSmallIntegerField()),
+                ('gender', models.CharField(default='M', max_length=1)),
+            ],
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Adds login_key and hashes the stored passwords, written by hand
+
+import unicodedata
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def _normalize_login_name(name):
+    """
+    user_api.models.normalize_login_name as it was when this migration was written,
+    copied so that replaying the migration never gives other keys
+    """
+    return unicodedata.normalize('NFKC', name).casefold()
+
+
+def _is_hashed(password):
+    try:
+        identify_hasher(password)
+    except ValueError:
+        return False
+    return True
+
+
+def hash_passwords(apps, schema_editor):
+    """
+    Replaces plaintext passwords with hashes and fills login_key.
+    Rows are walked in primary key order in batches, so the migration can be
+    re-run safely after an interruption.
+    """
+    UserModel = apps.get_model('user_api', 'UserModel')
+    db_alias = schema_editor.connection.alias
+    queryset = UserModel.objects.using(db_alias).order_by('user_id')
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(user_id__gt=last_pk)
+        batch = list(batch.only('user_id', 'name', 'password')[:BATCH_SIZE])
+        if not batch:
+            break
+        for user in batch:
+            user.login_key = _normalize_login_name(user.name)
+            if not _is_hashed(user.password):
+                user.password = make_password(user.password)
+            user.save(update_fields=['login_key', 'password'])
+        last_pk = batch[-1].user_id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermodel',
+            name='login_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=150),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='usermodel',
+            name='password',
+            field=models.CharField(max_length=128),
+        ),
+        # hashes cannot be turned back into plaintext, reversing keeps them
+        migrations.RunPython(hash_passwords, migrations.RunPython.noop),
+    ]
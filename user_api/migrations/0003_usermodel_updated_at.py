@@ -0,0 +1,18 @@
+# Generated by Django 2.0 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0002_hash_passwords'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermodel',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
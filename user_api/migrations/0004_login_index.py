@@ -0,0 +1,23 @@
+# Generated by Django 2.0 on 2026-10-18 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0003_usermodel_updated_at'),
+    ]
+
+    operations = [
+        # build the covering index before dropping the one it replaces
+        migrations.AddIndex(
+            model_name='usermodel',
+            index=models.Index(fields=['login_key', 'password'], name='user_login_idx'),
+        ),
+        migrations.AlterField(
+            model_name='usermodel',
+            name='login_key',
+            field=models.CharField(editable=False, max_length=150),
+        ),
+    ]
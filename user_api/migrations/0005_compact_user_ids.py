@@ -0,0 +1,109 @@
+# Generated by Django 2.0 on 2026-10-18 12:20
+
+from django.db import migrations
+import user_api.fields
+import user_api.ids
+
+BATCH_SIZE = 1000
+
+
+def _batches(connection, select_sql):
+    """
+    yields lists of primary keys in key order, one short query per batch
+    """
+    last = ''
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(select_sql, [last, BATCH_SIZE])
+            keys = [row[0] for row in cursor.fetchall()]
+        if not keys:
+            return
+        yield keys
+        last = keys[-1]
+
+
+def _compact_mysql(schema_editor, table_name):
+    """
+    char(32) hex -> binary(16) without blocking writes:
+    a shadow column kept current by triggers, a batched backfill in short
+    transactions, then one in-place ALTER that swaps the primary key.
+    Every step can be repeated, so an interrupted run is simply started again.
+    """
+    connection = schema_editor.connection
+    table = schema_editor.quote_name(table_name)
+    execute = schema_editor.execute
+    with connection.cursor() as cursor:
+        columns = {column.name for column in connection.introspection.get_table_description(cursor, table_name)}
+    if 'user_id_compact' not in columns:
+        execute('ALTER TABLE {} ADD COLUMN user_id_compact BINARY(16) NULL'.format(table))
+    for event in ('INSERT', 'UPDATE'):
+        execute('DROP TRIGGER IF EXISTS user_id_compact_{}'.format(event.lower()))
+        execute('CREATE TRIGGER user_id_compact_{} BEFORE {} ON {} FOR EACH ROW '
+                'SET NEW.user_id_compact = UNHEX(NEW.user_id)'.format(event.lower(), event, table))
+    select_sql = 'SELECT user_id FROM {} WHERE user_id > %s AND user_id_compact IS NULL ' \
+                 'ORDER BY user_id LIMIT %s'.format(table)
+    for keys in _batches(connection, select_sql):
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE {} SET user_id_compact = UNHEX(user_id) WHERE user_id >= %s AND user_id <= %s'
+                           .format(table), [keys[0], keys[-1]])
+    execute('ALTER TABLE {} DROP PRIMARY KEY, DROP COLUMN user_id, '
+            'CHANGE user_id_compact user_id BINARY(16) NOT NULL, ADD PRIMARY KEY (user_id), '
+            'ALGORITHM=INPLACE, LOCK=NONE'.format(table))
+    execute('DROP TRIGGER IF EXISTS user_id_compact_insert')
+    execute('DROP TRIGGER IF EXISTS user_id_compact_update')
+
+
+def _compact_sqlite(schema_editor, table_name):
+    """
+    SQLite keeps blobs as-is in a char column, so ids are rewritten in place
+    """
+    table = schema_editor.quote_name(table_name)
+    select_sql = "SELECT user_id FROM {} WHERE user_id > %s AND typeof(user_id) = 'text' " \
+                 "ORDER BY user_id LIMIT %s".format(table)
+    for keys in _batches(schema_editor.connection, select_sql):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany('UPDATE {} SET user_id = %s WHERE user_id = %s'.format(table),
+                               [(bytes.fromhex(key), key) for key in keys])
+
+
+def compact_user_ids(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.features.has_native_uuid_field:
+        # postgres already stores uuid in 16 bytes
+        return
+    table_name = apps.get_model('user_api', 'UserModel')._meta.db_table
+    if connection.vendor == 'mysql':
+        _compact_mysql(schema_editor, table_name)
+    elif connection.vendor == 'sqlite':
+        _compact_sqlite(schema_editor, table_name)
+    else:
+        raise NotImplementedError('No compact uuid migration for {}'.format(connection.vendor))
+
+
+class Migration(migrations.Migration):
+    """
+    Moves user_id to 16 byte storage, new ids are time-ordered uuid7.
+    Existing ids keep their values. Not atomic: the backfill commits batch by
+    batch so it can run against a live table, and a rerun skips finished rows.
+    """
+    atomic = False
+
+    dependencies = [
+        ('user_api', '0004_login_index'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(compact_user_ids),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='usermodel',
+                    name='user_id',
+                    field=user_api.fields.CompactUUIDField(default=user_api.ids.uuid7, editable=False,
+                                                           primary_key=True, serialize=False),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 2.0 on 2026-10-18 12:18
+
+from collections import Counter
+from django.db import migrations, models
+from django.db.models import Count
+
+# user_api.stats.AGE_BANDS as it was when this migration was written, copied so that
+# replaying the migration never gives other counts
+AGE_BANDS = ((0, '0-17'), (18, '18-24'), (25, '25-34'), (35, '35-44'), (45, '45-54'), (55, '55-64'), (65, '65+'))
+
+
+def _age_band(age):
+    label = AGE_BANDS[0][1]
+    for lowest, band in AGE_BANDS:
+        if age < lowest:
+            break
+        label = band
+    return label
+
+
+def count_existing_users(apps, schema_editor):
+    UserModel = apps.get_model('user_api', 'UserModel')
+    UserStatsModel = apps.get_model('user_api', 'UserStatsModel')
+    db_alias = schema_editor.connection.alias
+    counts = Counter()
+    for row in UserModel.objects.using(db_alias).order_by().values('gender', 'age').annotate(users=Count('pk')):
+        counts[row['gender'], _age_band(row['age'])] += row['users']
+    UserStatsModel.objects.using(db_alias).bulk_create([
+        UserStatsModel(gender=gender, age_band=band, users=users) for (gender, band), users in counts.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0006_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatsModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gender', models.CharField(max_length=1)),
+                ('age_band', models.CharField(max_length=8)),
+                ('users', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('gender', 'age_band')},
+            },
+        ),
+        migrations.RunPython(count_existing_users, migrations.RunPython.noop),
+    ]
@@ -1,17 +1,84 @@
-import uuid
+import unicodedata
+from django.contrib.auth.hashers import check_password, make_password
 from django.db import models
+from user_api.fields import CompactUUIDField
+from user_api.ids import uuid7
+
+# largest age every backend stores in a PositiveSmallIntegerField
+MAX_AGE = 32767
+
+
+def normalize_login_name(name):
+    """
+    normalizes a name into the key used for login lookups
+    :return: NFKC normalized, case folded name
+    """
+    return unicodedata.normalize('NFKC', name).casefold()
 
 
 class UserModel(models.Model):
-    user_id = models.UUIDField(
-        primary_key=True, default=uuid.uuid1, editable=False)
+    user_id = CompactUUIDField(
+        primary_key=True, default=uuid7, editable=False)
     name = models.CharField(max_length=50)
+    login_key = models.CharField(max_length=150, editable=False)
     email = models.EmailField()
-    password = models.CharField(max_length=100)
+    password = models.CharField(max_length=128)
     phone_number = models.CharField(max_length=13, unique=True)
     age = models.PositiveSmallIntegerField()
     gender = models.CharField(max_length=1, default='M')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # login filters on login_key and reads password, covered without touching the table
+            models.Index(fields=['login_key', 'password'], name='user_login_idx'),
+            # list filters and orderings (see user_api.filters, user_api.pagination)
+            models.Index(fields=['name', 'user_id'], name='user_name_idx'),
+            models.Index(fields=['age', 'user_id'], name='user_age_idx'),
+            models.Index(fields=['gender', 'user_id'], name='user_gender_idx'),
+            models.Index(fields=['email'], name='user_email_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(UserModel, cls).from_db(db, field_names, values)
+        if 'gender' in instance.__dict__ and 'age' in instance.__dict__:
+            # as counted in the statistics, so a later save can move it (see user_api.stats)
+            instance._counted_as = (instance.gender, instance.age)
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.populate_login_key()
+        super(UserModel, self).save(*args, **kwargs)
+
+    def populate_login_key(self):
+        """
+        derives login_key from name, call before bulk_create (save() does it itself)
+        """
+        self.login_key = normalize_login_name(self.name)
+
+    def set_password(self, raw_password):
+        self.password = make_password(raw_password)
+
+    def check_password(self, raw_password):
+        """
+        verifies raw_password against the stored hash
+        :return: True if matches, False if does not
+        """
+        return check_password(raw_password, self.password)
 
     def __str__(self):
         return 'User Model\nName: {}\nEmail: {}\nAge: {}\nGender:\n'.\
             format(self.name, self.email, self.age, self.gender)
+
+
+class UserStatsModel(models.Model):
+    """
+    Users per gender and age band, kept current by user_api.stats
+    """
+    gender = models.CharField(max_length=1)
+    age_band = models.CharField(max_length=8)
+    users = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (('gender', 'age_band'), )
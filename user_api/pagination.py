@@ -0,0 +1,139 @@
+import json
+import uuid
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination
+from user_api.models import MAX_AGE
+
+
+class UserCursorPagination(CursorPagination):
+    """
+    Keyset pagination for user list
+
+    Pages are fetched with `WHERE user_id > <cursor> ORDER BY user_id LIMIT n`,
+    so every page costs the same regardless of how deep the client is.
+
+    `?ordering=` picks one of `orderings`, each backed by an index ending in
+    user_id. The cursor then holds the (value, user_id) pair of the last row
+    and a page is one index range: `name >= <value>` narrowed by
+    `name > <value> OR user_id > <user_id>`.
+    """
+    ordering = 'user_id'
+    ordering_param = 'ordering'
+    orderings = {
+        'user_id': ('user_id', ),
+        '-user_id': ('-user_id', ),
+        'name': ('name', 'user_id'),
+        '-name': ('-name', '-user_id'),
+        'age': ('age', 'user_id'),
+        '-age': ('-age', '-user_id'),
+    }
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    # checks of the value a cursor holds for the first field of an ordering
+    position_values = {
+        'name': lambda value: isinstance(value, str),
+        'age': lambda value: type(value) is int and 0 <= value <= MAX_AGE,
+    }
+
+    def get_ordering(self, request, queryset, view):
+        value = request.query_params.get(self.ordering_param, self.ordering)
+        if value not in self.orderings:
+            raise ValidationError({self.ordering_param: 'Choose one of {}'.format(', '.join(sorted(self.orderings)))})
+        return self.orderings[value]
+
+    def _get_position_from_instance(self, instance, ordering):
+        if len(ordering) == 1:
+            return super(UserCursorPagination, self)._get_position_from_instance(instance, ordering)
+        return json.dumps([instance[ordering[0].lstrip('-')], str(instance['user_id'])])
+
+    def _decode_position(self, position):
+        """
+        :param position: position taken from the cursor, which the client may have altered
+        :return: (value, user_id), value is None for the user_id orderings
+        :raise NotFound: if position does not fit the ordering
+        """
+        try:
+            if len(self.ordering) == 1:
+                return None, uuid.UUID(position)
+            decoded = json.loads(position)
+            if not isinstance(decoded, list) or len(decoded) != 2 or not isinstance(decoded[1], str):
+                raise ValueError('Malformed position')
+            value, user_id = decoded
+            if not self.position_values[self.ordering[0].lstrip('-')](value):
+                raise ValueError('Malformed position value')
+            return value, uuid.UUID(user_id)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _position_filter(self, position, greater):
+        """
+        :param position: position taken from the cursor
+        :param greater: True to select rows after position in ascending order
+        :return: Q selecting rows beyond position
+        """
+        lookup, range_lookup = ('__gt', '__gte') if greater else ('__lt', '__lte')
+        value, user_id = self._decode_position(position)
+        if len(self.ordering) == 1:
+            return Q(**{'user_id' + lookup: user_id})
+        field = self.ordering[0].lstrip('-')
+        # the first condition is the index range, the second is checked on the rows it returns
+        return (Q(**{field + range_lookup: value}) &
+                (Q(**{field + lookup: value}) | Q(**{'user_id' + lookup: user_id})))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        CursorPagination.paginate_queryset with a (value, user_id) position
+        positions are unique, so cursors never need an offset
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*[field[1:] if field.startswith('-') else '-' + field
+                                           for field in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            is_reversed = self.ordering[0].startswith('-')
+            queryset = queryset.filter(self._position_filter(current_position, reverse == is_reversed))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
@@ -0,0 +1,29 @@
+import json
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline delimited json lazily, one item per line
+
+    Lines which are not valid json are passed through as strings so that
+    the consumer reports them per item instead of failing the whole stream.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return self._iter_items(stream, encoding)
+
+    @staticmethod
+    def _iter_items(stream, encoding):
+        for raw_line in stream:
+            line = raw_line.decode(encoding).strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield line
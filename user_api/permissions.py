@@ -0,0 +1,18 @@
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+from user_api.tokens import SessionToken
+
+
+class IsAdminOrTokenOwner(BasePermission):
+    """
+    Staff API clients may do everything, as with IsAuthenticated and IsAdminUser
+
+    A user authenticated with a session token (see
+    user_api.authentication.SignedTokenAuthentication) only reads its own
+    record, GET /users/<its user_id>/.
+    """
+
+    def has_permission(self, request, view):
+        if isinstance(request.auth, SessionToken):
+            return request.method in SAFE_METHODS and view.kwargs.get('user_id') == request.auth.user_id
+        return bool(request.user and request.user.is_authenticated and request.user.is_staff)
+
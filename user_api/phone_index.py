@@ -0,0 +1,191 @@
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from django.conf import settings
+from django.db import DatabaseError
+from rest_framework.validators import UniqueValidator
+from user_api.models import UserModel
+
+# PhoneNumberValidator accepts any 4 characters between the hyphens, most numbers are digits
+_DIGITS = re.compile('010-([0-9]{4})-([0-9]{4})').fullmatch
+
+
+def phone_number_key(phone_number):
+    """
+    :return: the 8 digits after 010 as an int, None if phone_number has another shape
+    """
+    match = _DIGITS(phone_number)
+    return int(match.group(1) + match.group(2)) if match else None
+
+
+class PhoneNumberIndex(object):
+    """
+    Sorted array of the phone numbers stored, as 4 byte integers
+
+    Answers "is this number certainly new?" without a query. It is loaded on
+    first use and kept current from the UserModel signals and the bulk
+    insert paths of this process, so it can lag behind the other processes:
+    a number another worker registered is only caught by the unique
+    constraint (counted as `conflicts`), a number deleted elsewhere costs a
+    query that finds nothing (counted as `false_positives`). Numbers which
+    do not fit the 010-XXXX-XXXX digits always go to the database.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._keys = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.lookups = 0
+        self.skipped = 0
+        self.unindexed = 0
+        self.false_positives = 0
+        self.conflicts = 0
+
+    @property
+    def loaded(self):
+        return self._keys is not None
+
+    def load(self):
+        """
+        reads every stored phone number, ~4 bytes per user
+        :return: True if loaded, False if the table cannot be read (e.g. before migrate)
+        """
+        started = time.perf_counter()
+        try:
+            numbers = UserModel.objects.values_list('phone_number', flat=True).iterator(chunk_size=10000)
+            keys = array('I', sorted({key for key in map(phone_number_key, numbers) if key is not None}))
+        except DatabaseError:
+            return False
+        with self._lock:
+            self._keys = keys
+            self.load_seconds = time.perf_counter() - started
+        return True
+
+    def might_exist(self, phone_number):
+        """
+        :return: False if no user of this process' view has phone_number, True if the database must tell
+        """
+        if not self.enabled or (self._keys is None and not self.load()):
+            return True
+        key = phone_number_key(phone_number)
+        with self._lock:
+            self.lookups += 1
+            if key is None:
+                self.unindexed += 1
+                return True
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                return True
+            self.skipped += 1
+            return False
+
+    def add_many(self, phone_numbers):
+        """
+        merges a batch into a new array in one pass and swaps it in, so it
+        costs one copy of the index instead of one shift per number
+        """
+        keys = sorted({key for key in map(phone_number_key, phone_numbers) if key is not None})
+        if not keys:
+            return
+        with self._lock:
+            if self._keys is None:
+                # not loaded yet, the load will read them
+                return
+            current = self._keys
+            if len(keys) == 1:
+                # one registration, a single shift is cheaper than a copy
+                position = bisect_left(current, keys[0])
+                if position == len(current) or current[position] != keys[0]:
+                    current.insert(position, keys[0])
+                return
+            merged = array('I')
+            start = 0
+            for key in keys:
+                position = bisect_left(current, key, start)
+                merged.extend(current[start:position])
+                if position == len(current) or current[position] != key:
+                    merged.append(key)
+                start = position
+            merged.extend(current[start:])
+            self._keys = merged
+
+    def add(self, phone_number):
+        self.add_many([phone_number])
+
+    def discard(self, phone_number):
+        key = phone_number_key(phone_number)
+        with self._lock:
+            if self._keys is None or key is None:
+                return
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def record_false_positives(self, count=1):
+        with self._lock:
+            self.false_positives += count
+
+    def record_conflict(self, phone_number):
+        """
+        the unique constraint rejected a number the index did not have
+        """
+        with self._lock:
+            self.conflicts += 1
+        self.add(phone_number)
+
+    def stats(self):
+        with self._lock:
+            checked = self.lookups - self.skipped - self.unindexed
+            return {
+                'enabled': self.enabled,
+                'loaded': self._keys is not None,
+                'entries': len(self._keys) if self._keys is not None else 0,
+                'bytes': self._keys.buffer_info()[1] * self._keys.itemsize if self._keys is not None else 0,
+                'load_ms': self.load_seconds * 1000 if self.load_seconds is not None else None,
+                'lookups': self.lookups,
+                'skipped_queries': self.skipped,
+                'unindexed': self.unindexed,
+                'false_positives': self.false_positives,
+                'false_positive_rate': self.false_positives / checked if checked else 0.0,
+                'conflicts': self.conflicts,
+            }
+
+
+def _build_phone_number_index():
+    return PhoneNumberIndex(enabled=getattr(settings, 'PHONE_NUMBER_INDEX', True))
+
+
+phone_number_index = _build_phone_number_index()
+
+
+def phone_number_conflict(phone_number, index=phone_number_index):
+    """
+    tells a phone_number unique violation from the other constraint failures after an IntegrityError
+    :return: True, with the conflict recorded, if a stored user has phone_number
+    """
+    if not UserModel.objects.filter(phone_number=phone_number).exists():
+        return False
+    index.record_conflict(phone_number)
+    return True
+
+
+class IndexedUniqueValidator(UniqueValidator):
+    """
+    UniqueValidator for phone_number which skips the query for numbers the index has never seen
+    """
+
+    def __init__(self, index=phone_number_index, **kwargs):
+        kwargs.setdefault('queryset', UserModel.objects.all())
+        super(IndexedUniqueValidator, self).__init__(**kwargs)
+        self.index = index
+
+    def __call__(self, value, *args):
+        if not self.index.might_exist(value):
+            return
+        super(IndexedUniqueValidator, self).__call__(value, *args)
+        # the index had the number, the database does not (deleted elsewhere, or a rolled back insert)
+        if phone_number_key(value) is not None:
+            self.index.record_false_positives()
@@ -0,0 +1,88 @@
+import datetime
+import decimal
+import uuid
+from rest_framework.renderers import BaseRenderer
+from user_api.representation import render_json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+def _plain(value):
+    """
+    fallback for values msgpack has no type for, encoded like the JSON renderer does
+    """
+    if isinstance(value, (uuid.UUID, decimal.Decimal)):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError('Cannot encode {}'.format(type(value).__name__))
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack, needs the optional `msgpack` package
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, use_bin_type=True, default=_plain)
+
+
+class CBORRenderer(BaseRenderer):
+    """
+    CBOR (RFC 8949), needs the optional `cbor2` package
+    """
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return cbor2.dumps(data)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline delimited json, one list item per line
+
+    For a page the items are its results; the next/previous page links move
+    to a `Link` header.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict) and 'results' in data:
+            response = (renderer_context or {}).get('response')
+            links = ['<{}>; rel="{}"'.format(data[key], rel)
+                     for key, rel in (('next', 'next'), ('previous', 'prev')) if data.get(key)]
+            if response is not None and links:
+                response['Link'] = ', '.join(links)
+            data = data['results']
+        if not isinstance(data, list):
+            data = [data]
+        return b''.join(render_json(item) + b'\n' for item in data)
+
+
+# binary renderers whose encoder is installed
+COMPACT_RENDERERS = tuple(renderer for renderer, module in ((MessagePackRenderer, msgpack), (CBORRenderer, cbor2))
+                          if module is not None)
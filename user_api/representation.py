@@ -0,0 +1,127 @@
+import json
+from operator import itemgetter
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# DRF field classes whose representation of a database value is the value itself
+_PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField)
+# DRF field classes rendered as str() of the database value
+_STR_FIELDS = (serializers.UUIDField, )
+
+
+def render_json(data):
+    """
+    encodes data exactly like rest_framework.renderers.JSONRenderer with the
+    default compact/strict settings; uses orjson when it is installed
+    :param data: plain dicts, lists, str, int and None
+    :return: utf-8 encoded json bytes
+    """
+    if orjson is not None:
+        body = orjson.dumps(data)
+        return body.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    body = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    return body.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode('utf-8')
+
+
+def accepts_fast_json(request):
+    """
+    :return: True if the negotiated response is plain compact json, which render_json reproduces
+    """
+    return (request.accepted_renderer.format == 'json' and api_settings.COMPACT_JSON and
+            api_settings.STRICT_JSON and 'indent' not in (request.accepted_media_type or ''))
+
+
+class RowRepresentation(object):
+    """
+    Read-only fast path for a flat ModelSerializer
+
+    Works on rows from `queryset.values(*representation.columns)` instead of
+    model instances: no field objects per row, no to_representation calls, one
+    plain dict per row with the serializer's keys in the serializer's order.
+    Output is identical to the serializer for the field types it supports.
+    `fields` narrows it to some of the serializer's fields, see restrict().
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        self._serializer_class = serializer_class
+        self._fields = None if fields is None else frozenset(fields)
+        self._compiled = None
+        self._restricted = {}
+
+    def _compile(self):
+        names, columns, converters = [], [], []
+        for name, field in self._serializer_class().fields.items():
+            if field.write_only or (self._fields is not None and name not in self._fields):
+                continue
+            if isinstance(field, _STR_FIELDS):
+                converters.append((name, str))
+            elif not isinstance(field, _PASSTHROUGH_FIELDS):
+                raise TypeError('{} is not supported by RowRepresentation'.format(type(field).__name__))
+            names.append(name)
+            columns.append(field.source)
+        if len(columns) == 1:
+            column = columns[0]
+            getter = lambda row: (row[column], )  # noqa: E731
+        else:
+            getter = itemgetter(*columns)
+        self._compiled = (tuple(names), tuple(columns), tuple(converters), getter)
+        return self._compiled
+
+    @property
+    def names(self):
+        """
+        :return: keys of the represented dicts, in order
+        """
+        return (self._compiled or self._compile())[0]
+
+    @property
+    def columns(self):
+        """
+        :return: model columns to select with `.values()`
+        """
+        return (self._compiled or self._compile())[1]
+
+    def restrict(self, fields):
+        """
+        representation of a subset of the fields, compiled once per subset
+        :param fields: iterable of field names
+        :return: RowRepresentation
+        :raise ValueError: for names which are not fields of this representation
+        """
+        fields = frozenset(fields)
+        representation = self._restricted.get(fields)
+        if representation is None:
+            unknown = fields.difference(self.names)
+            if unknown or not fields:
+                raise ValueError('Choose from {}'.format(', '.join(self.names)))
+            representation = self._restricted[fields] = RowRepresentation(self._serializer_class, fields)
+        return representation
+
+    def to_dict(self, row):
+        """
+        :param row: dict from `.values()` holding at least `columns`
+        :return: dict equal to the serializer's data
+        """
+        names, _, converters, getter = self._compiled or self._compile()
+        data = dict(zip(names, getter(row)))
+        for name, convert in converters:
+            if data[name] is not None:
+                data[name] = convert(data[name])
+        return data
+
+    def from_instance(self, instance):
+        """
+        same as to_dict, for a model instance which has `columns` loaded
+        """
+        return self.to_dict({column: getattr(instance, column) for column in self.columns})
+
+    def many(self, rows):
+        names, _, converters, getter = self._compiled or self._compile()
+        if converters:
+            return [self.to_dict(row) for row in rows]
+        return [dict(zip(names, getter(row))) for row in rows]
@@ -1,13 +1,25 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from user_api.validators import *
-from user_api.models import UserModel
+from user_api.models import MAX_AGE, UserModel
+from user_api.phone_index import IndexedUniqueValidator, phone_number_conflict
+from user_api.representation import RowRepresentation
 
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserModel
-        exclude = ('user_id', 'password', 'phone_number')
+        exclude = ('user_id', 'password', 'phone_number', 'login_key', 'updated_at')
+
+
+class UserFieldsSerializer(serializers.ModelSerializer):
+    """
+    UserSerializer plus user_id, the fields a client can pick with `fields=`
+    """
+    class Meta:
+        model = UserModel
+        fields = ('user_id', 'name', 'email', 'age', 'gender')
 
 
 class UserCreateSerializer(serializers.Serializer):
@@ -16,18 +28,37 @@ class UserCreateSerializer(serializers.Serializer):
     password = serializers.CharField(
         max_length=100, validators=[PasswordValidator()])
     phone_number = serializers.CharField(max_length=13, validators=[
-                                         PhoneNumberValidator(), UniqueValidator(queryset=UserModel.objects.all())])
-    age = serializers.IntegerField()
+                                         PhoneNumberValidator(), IndexedUniqueValidator()])
+    age = serializers.IntegerField(min_value=0, max_value=MAX_AGE)
     gender = serializers.CharField(
         max_length=1, default='M', validators=[GenderValidator()])
 
     def create(self, validated_data):
-        return UserModel.objects.create(**validated_data)
+        user = UserModel(**validated_data)
+        user.set_password(validated_data['password'])
+        try:
+            with transaction.atomic():
+                user.save()
+        except IntegrityError:
+            # registered by another process since the validators ran, any other violation is a bug
+            if not phone_number_conflict(user.phone_number):
+                raise
+            raise serializers.ValidationError({'phone_number': [str(UniqueValidator.message)]})
+        return user
 
     def update(self, instance, validated_data):
         raise AttributeError('Update not supported')
 
 
+class BulkUserCreateSerializer(UserCreateSerializer):
+    """
+    UserCreateSerializer without the per-row uniqueness query,
+    phone numbers are checked once per chunk by user_api.bulk instead
+    """
+    phone_number = serializers.CharField(
+        max_length=13, validators=[PhoneNumberValidator()])
+
+
 class LoginSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserModel
@@ -38,3 +69,9 @@ class LoginResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserModel
         fields = ('user_id', )
+
+
+# read-only fast paths producing the same data as the serializers above
+user_representation = RowRepresentation(UserSerializer)
+user_fields_representation = RowRepresentation(UserFieldsSerializer)
+login_result_representation = RowRepresentation(LoginResultSerializer)
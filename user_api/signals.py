@@ -0,0 +1,74 @@
+import logging
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished, request_started
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from user_api.authentication import invalidate_user
+from user_api.cache import user_detail_cache
+from user_api.db.backends.mixins import serve_requests
+from user_api.db.metrics import connect_metrics
+from user_api.models import UserModel
+from user_api.phone_index import phone_number_index
+from user_api.stats import record_deleted, record_saved
+
+logger = logging.getLogger('user_api.db')
+
+# fields which change the outcome of authentication/permission checks
+AUTH_FIELDS = frozenset(['username', 'password', 'is_active', 'is_staff', 'is_superuser'])
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_credentials_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and AUTH_FIELDS.isdisjoint(update_fields):
+        return
+    invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def invalidate_credentials_on_delete(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=UserModel)
+@receiver(post_delete, sender=UserModel)
+def invalidate_user_detail(sender, instance, **kwargs):
+    user_detail_cache.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=UserModel)
+def count_saved_user(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        record_saved(instance, created)
+
+
+@receiver(post_delete, sender=UserModel)
+def count_deleted_user(sender, instance, **kwargs):
+    record_deleted(instance)
+
+
+@receiver(post_save, sender=UserModel)
+def index_phone_number(sender, instance, **kwargs):
+    # added right away: until the commit it only costs a query, a late add could let a duplicate through
+    phone_number_index.add(instance.phone_number)
+
+
+@receiver(post_delete, sender=UserModel)
+def unindex_phone_number(sender, instance, **kwargs):
+    transaction.on_commit(lambda: phone_number_index.discard(instance.phone_number))
+
+
+@receiver(request_started)
+def prepare_connections(sender, **kwargs):
+    serve_requests()
+    connect_metrics.start_request()
+    for connection in connections.all():
+        if hasattr(connection, 'check_health'):
+            connection.check_health()
+
+
+@receiver(request_finished)
+def log_connect_time(sender, **kwargs):
+    if connect_metrics.request_count():
+        logger.debug('acquired %d connection(s) in %.2fms',
+                     connect_metrics.request_count(), connect_metrics.request_seconds() * 1000)
@@ -0,0 +1,110 @@
+from collections import Counter
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from user_api.models import UserModel, UserStatsModel
+
+# (lowest age, label), ascending; a band ends where the next one starts
+AGE_BANDS = ((0, '0-17'), (18, '18-24'), (25, '25-34'), (35, '35-44'), (45, '45-54'), (55, '55-64'), (65, '65+'))
+
+
+def age_band(age):
+    """
+    :return: label of the band age falls in
+    """
+    label = AGE_BANDS[0][1]
+    for lowest, band in AGE_BANDS:
+        if age < lowest:
+            break
+        label = band
+    return label
+
+
+def stats_key(gender, age):
+    return gender, age_band(age)
+
+
+def count_users(user_model):
+    """
+    counts users per (gender, age band) with one grouped query
+    :param user_model: UserModel, or its historical version in a migration
+    :return: Counter of (gender, age band) -> users
+    """
+    counts = Counter()
+    for row in user_model.objects.order_by().values('gender', 'age').annotate(users=Count('pk')):
+        counts[stats_key(row['gender'], row['age'])] += row['users']
+    return counts
+
+
+def apply_deltas(deltas):
+    """
+    adds deltas to the stored counts, one atomic UPDATE per changed cell
+    :param deltas: mapping of (gender, age band) -> change in users
+    """
+    for (gender, band), delta in deltas.items():
+        if not delta:
+            continue
+        cell = UserStatsModel.objects.filter(gender=gender, age_band=band)
+        if cell.update(users=F('users') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                UserStatsModel.objects.create(gender=gender, age_band=band, users=delta)
+        except IntegrityError:
+            # a concurrent writer created the cell first
+            cell.update(users=F('users') + delta)
+
+
+def record_created(users):
+    """
+    counts newly inserted users, call next to bulk_create (save() is counted by signals)
+    """
+    apply_deltas(Counter(stats_key(user.gender, user.age) for user in users))
+
+
+def record_saved(user, created):
+    """
+    counts a saved user, moving it between cells when gender or age changed
+    an update of a user not loaded from the database cannot be attributed and is left to rebuild()
+    """
+    key = stats_key(user.gender, user.age)
+    previous = getattr(user, '_counted_as', None)
+    if created:
+        apply_deltas({key: 1})
+    elif previous is not None and stats_key(*previous) != key:
+        apply_deltas({stats_key(*previous): -1, key: 1})
+    user._counted_as = (user.gender, user.age)
+
+
+def record_deleted(user):
+    apply_deltas({stats_key(*getattr(user, '_counted_as', (user.gender, user.age))): -1})
+
+
+def rebuild():
+    """
+    recounts every cell from the user table, fixing drift from QuerySet.update() and raw SQL
+    :return: total users counted
+    """
+    with transaction.atomic():
+        counts = count_users(UserModel)
+        UserStatsModel.objects.all().delete()
+        UserStatsModel.objects.bulk_create([
+            UserStatsModel(gender=gender, age_band=band, users=users) for (gender, band), users in counts.items()])
+    return sum(counts.values())
+
+
+def summary():
+    """
+    reads the stored counts, cost does not grow with the number of users
+    :return: dict of totals by gender, by age band and by both
+    """
+    by_gender, by_age_band, by_both = Counter(), Counter(), {}
+    for gender, band, users in UserStatsModel.objects.filter(users__gt=0).values_list('gender', 'age_band', 'users'):
+        by_gender[gender] += users
+        by_age_band[band] += users
+        by_both.setdefault(gender, {})[band] = users
+    return {
+        'total': sum(by_gender.values()),
+        'by_gender': dict(by_gender),
+        'by_age_band': {band: by_age_band[band] for _, band in AGE_BANDS},
+        'by_gender_and_age_band': by_both,
+    }
@@ -0,0 +1,80 @@
+from operator import itemgetter
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from user_api.representation import render_json
+
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _chunk_size():
+    return getattr(settings, 'USER_STREAM_CHUNK_SIZE', 2000)
+
+
+def iter_keyset(rows, chunk_size, key=itemgetter('user_id')):
+    """
+    yields rows in user_id order, one `WHERE user_id > <last> ORDER BY user_id LIMIT chunk_size`
+    query at a time, so at most chunk_size rows are held whatever the driver does with a result
+    set (mysqlclient reads a whole one into memory, .iterator() only streams on Postgres)
+    :param rows: `.values()` or `.values_list()` queryset selecting user_id
+    :param chunk_size: rows per query
+    :param key: reads the user_id of a row
+    :return: generator of rows
+    """
+    rows = rows.order_by('user_id')
+    batch = list(rows[:chunk_size])
+    while batch:
+        yield from batch
+        if len(batch) < chunk_size:
+            return
+        batch = list(rows.filter(user_id__gt=key(batch[-1]))[:chunk_size])
+
+
+def _iter_rows(queryset, representation):
+    """
+    yields represented rows one by one, reading them in batches of USER_STREAM_CHUNK_SIZE
+    :param queryset: queryset to export
+    :param representation: RowRepresentation used for each row
+    :return: generator of dicts
+    """
+    columns = ('user_id', ) + tuple(column for column in representation.columns if column != 'user_id')
+    for row in iter_keyset(queryset.values(*columns), _chunk_size()):
+        yield representation.to_dict(row)
+
+
+def iter_json(queryset, representation):
+    """
+    encodes queryset as a single json array, one row at a time
+    :return: generator of byte chunks
+    """
+    separator = b'['
+    for row in _iter_rows(queryset, representation):
+        yield separator + render_json(row)
+        separator = b','
+    yield b'[]' if separator == b'[' else b']'
+
+
+def iter_ndjson(queryset, representation):
+    """
+    encodes queryset as newline delimited json
+    :return: generator of byte chunks
+    """
+    for row in _iter_rows(queryset, representation):
+        yield render_json(row) + b'\n'
+
+
+def stream_queryset(queryset, representation, stream_format):
+    """
+    builds a streaming response for queryset
+    :param queryset: queryset to export
+    :param representation: RowRepresentation used for each row
+    :param stream_format: one of STREAM_FORMATS
+    :return: StreamingHttpResponse
+    """
+    if stream_format == 'ndjson':
+        content = iter_ndjson(queryset, representation)
+    else:
+        content = iter_json(queryset, representation)
+    return StreamingHttpResponse(content, content_type=STREAM_FORMATS[stream_format])
@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+from rest_framework.throttling import BaseThrottle
+from user_api.models import normalize_login_name
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+
+def parse_rate(rate):
+    """
+    parses a DRF style rate such as '10/min'
+    :return: (requests, period in seconds), None for no limit
+    """
+    if not rate:
+        return None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+
+def consume(tat, now, interval, burst):
+    """
+    token bucket in its GCRA form: a single "theoretical arrival time" per key
+    replaces the token count and the refill timestamp
+    :param tat: stored arrival time, None for a full bucket
+    :param interval: seconds for one token to refill
+    :param burst: bucket size
+    :return: (seconds to wait, 0.0 if allowed; arrival time to store)
+    """
+    tat = now if tat is None or tat < now else tat
+    new_tat = tat + interval
+    allowed_at = new_tat - burst * interval
+    if now < allowed_at:
+        return allowed_at - now, tat
+    return 0.0, new_tat
+
+
+class LocalBucketStore(object):
+    """
+    Token buckets of this process, for a single worker
+    Bounded LRU: an evicted bucket comes back full.
+    """
+
+    def __init__(self, max_entries=100000):
+        self._max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, interval, burst):
+        """
+        takes one token from the bucket of key
+        :return: seconds until a token is available, 0.0 if one was taken
+        """
+        now = time.monotonic()
+        with self._lock:
+            wait, tat = consume(self._buckets.get(key), now, interval, burst)
+            self._buckets[key] = tat
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self._max_entries:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore(object):
+    """
+    Token buckets in a Django cache shared by the workers (e.g. memcached)
+
+    Read and write are two cache calls, so concurrent requests for the same
+    key may each take the last token: the limit can be overshot by the
+    number of concurrent requests, never by more.
+    """
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def consume(self, key, interval, burst):
+        now = time.time()
+        cache_key = 'user_api:throttle:{}'.format(key)
+        wait, tat = consume(self._cache.get(cache_key), now, interval, burst)
+        if not wait:
+            self._cache.set(cache_key, tat, int(tat - now) + 1)
+        return wait
+
+    def clear(self):
+        self._cache.clear()
+
+
+def _build_throttle_store():
+    from django.conf import settings
+    from django.core.cache import caches
+
+    options = getattr(settings, 'LOGIN_THROTTLE', {})
+    if options.get('CACHE_ALIAS'):
+        return CacheBucketStore(caches[options['CACHE_ALIAS']])
+    return LocalBucketStore(max_entries=options.get('MAX_ENTRIES', 100000))
+
+
+throttle_store = _build_throttle_store()
+
+
+class LoginThrottle(BaseThrottle):
+    """
+    Token buckets per client IP, per login name and for all logins together
+
+    Rates come from settings.LOGIN_THROTTLE['RATES'], e.g. {'ip': '30/min'};
+    a bucket holds one period's worth of requests. The global bucket caps the
+    password hashing a burst can cause however it is spread over IPs and names.
+    """
+    scopes = ('ip', 'name', 'global')
+    rejected = {scope: 0 for scope in scopes}
+
+    def __init__(self):
+        from django.conf import settings
+        rates = getattr(settings, 'LOGIN_THROTTLE', {}).get('RATES', {})
+        self.rates = {scope: parse_rate(rates.get(scope)) for scope in self.scopes}
+        self.store = throttle_store
+        self._wait = None
+
+    def get_keys(self, request):
+        """
+        :return: (scope, bucket key) pairs checked for request, cheapest to reject first
+        """
+        keys = [('ip', 'ip:{}'.format(self.get_ident(request)))]
+        data = request.data
+        name = data.get('name') if hasattr(data, 'get') else None
+        if isinstance(name, str):
+            keys.append(('name', 'name:{}'.format(normalize_login_name(name))))
+        keys.append(('global', 'global'))
+        return keys
+
+    def allow_request(self, request, view):
+        for scope, key in self.get_keys(request):
+            rate = self.rates[scope]
+            if rate is None:
+                continue
+            count, period = rate
+            wait = self.store.consume(key, period / count, count)
+            if wait:
+                LoginThrottle.rejected[scope] += 1
+                self._wait = wait
+                return False
+        return True
+
+    def wait(self):
+        return self._wait
+
+    @classmethod
+    def stats(cls):
+        return {'rejected': dict(cls.rejected)}
@@ -0,0 +1,126 @@
+import base64
+import hashlib
+import hmac
+import os
+import struct
+import time
+import uuid
+from collections import namedtuple
+from user_api.cache import TTLCache
+
+# issued at, expires at, logged in user_id, token id
+_PAYLOAD = struct.Struct('>II16s8s')
+
+SessionToken = namedtuple('SessionToken', ['key_id', 'user_id', 'token_id', 'issued_at', 'expires_at'])
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class TokenSigner(object):
+    """
+    Issues and verifies compact HMAC-SHA256 session tokens
+
+        <key id>.<payload>.<signature>, base64url without padding
+
+    The payload is a fixed 32 byte struct, so a token is about 90 characters.
+    A token stands for the user who logged in and nothing else: it carries
+    none of the privileges of the API client that called the login.
+    `keys` is a list of (key id, secret): the first signs, all of them verify,
+    so a key is rotated by putting a new one first and dropping the old one
+    once the tokens it signed have expired. Revoked token ids are remembered
+    until the token would have expired anyway, in a cache every worker shares
+    (see _build_token_signer); a local revocation set, for a single process,
+    drops its oldest entries when full, so size it for the revocations of one TTL.
+    """
+
+    def __init__(self, keys, ttl, revoked):
+        if not keys:
+            raise ValueError('At least one signing key is required')
+        # per-purpose keys, a leaked token key does not expose the secret it came from
+        self._keys = [(key_id, hmac.new(secret.encode('utf-8'), b'user_api.tokens', hashlib.sha256).digest())
+                      for key_id, secret in keys]
+        self._keys_by_id = dict(self._keys)
+        self.ttl = ttl
+        self._revoked = revoked
+
+    @staticmethod
+    def _revocation_key(token_id):
+        return 'user_api:revoked:{}'.format(token_id.hex())
+
+    def _sign(self, key, message):
+        return hmac.new(key, message, hashlib.sha256).digest()
+
+    def issue(self, user_id):
+        """
+        :param user_id: UUID of the user who logged in
+        :return: token string
+        """
+        now = int(time.time())
+        payload = _PAYLOAD.pack(now, now + self.ttl, user_id.bytes, os.urandom(8))
+        key_id, key = self._keys[0]
+        message = '{}.{}'.format(key_id, _b64encode(payload))
+        return '{}.{}'.format(message, _b64encode(self._sign(key, message.encode('ascii'))))
+
+    def verify(self, token):
+        """
+        checks signature, expiry and revocation; no database access
+        :return: SessionToken
+        :raise InvalidToken: for any token that is not currently valid
+        """
+        try:
+            key_id, payload, signature = token.split('.')
+            key = self._keys_by_id[key_id]
+            expected = self._sign(key, '{}.{}'.format(key_id, payload).encode('ascii'))
+            if not hmac.compare_digest(expected, _b64decode(signature)):
+                raise InvalidToken('Invalid signature')
+            issued_at, expires_at, user_id, token_id = _PAYLOAD.unpack(_b64decode(payload))
+        except (ValueError, KeyError, UnicodeError, struct.error):
+            raise InvalidToken('Malformed token')
+        if expires_at <= time.time():
+            raise InvalidToken('Token expired')
+        if self._revoked.get(self._revocation_key(token_id)) is not None:
+            raise InvalidToken('Token revoked')
+        return SessionToken(key_id, uuid.UUID(bytes=user_id), token_id, issued_at, expires_at)
+
+    def revoke(self, session_token):
+        """
+        rejects the token from now until it expires
+        """
+        remaining = session_token.expires_at - int(time.time())
+        if remaining > 0:
+            self._revoked.set(self._revocation_key(session_token.token_id), True, remaining)
+
+
+def _build_token_signer():
+    """
+    :return: TokenSigner, None if tokens are off because no revocation cache is shared between workers
+    """
+    from django.conf import settings
+    from django.core.cache import caches
+
+    options = getattr(settings, 'SESSION_TOKENS', {})
+    keys = options.get('KEYS') or [('0', settings.SECRET_KEY)]
+    ttl = options.get('TTL', 900)
+    alias = options.get('REVOCATION_CACHE_ALIAS')
+    # locmem is per process too, a logout in one worker would leave the token valid in the others
+    shared = alias and not settings.CACHES[alias]['BACKEND'].endswith('.LocMemCache')
+    if shared:
+        revoked = caches[alias]
+    elif options.get('LOCAL_REVOCATION'):
+        revoked = TTLCache(max_entries=options.get('REVOCATION_MAX_ENTRIES', 10000), ttl=ttl)
+    else:
+        return None
+    return TokenSigner(keys, ttl, revoked)
+
+
+token_signer = _build_token_signer()
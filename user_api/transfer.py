@@ -0,0 +1,229 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from operator import itemgetter
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from django.utils import timezone
+from user_api.ids import uuid7
+from user_api.lookup import parse_user_id
+from user_api.models import UserModel
+from user_api.phone_index import phone_number_index
+from user_api.representation import render_json
+from user_api.stats import record_created
+from user_api.streaming import iter_keyset
+from user_api.validators import GenderValidator, PasswordValidator, PhoneNumberValidator
+
+# columns of an export, and what an import reads; password is the stored hash
+FIELDS = ('user_id', 'name', 'email', 'password', 'phone_number', 'age', 'gender')
+FORMATS = ('csv', 'ndjson')
+
+
+class Progress(object):
+    """
+    Counts rows and reports them with the rate every `every` rows
+    """
+
+    def __init__(self, report, every, verb):
+        self.report = report
+        self.every = every
+        self.verb = verb
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._next = every
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def add(self, rows):
+        self.rows += rows
+        if self.every and self.rows >= self._next:
+            self._next = (self.rows // self.every + 1) * self.every
+            self.report('{} {} rows, {:.0f} rows/s'.format(self.verb, self.rows, self.rate()))
+
+
+def export_users(out, export_format, chunk_size, progress):
+    """
+    writes every user to out in user_id order, reading chunk_size rows per
+    query, so memory does not grow with the number of users
+    :param out: text stream
+    :param export_format: one of FORMATS
+    :param chunk_size: rows fetched per query
+    :param progress: Progress
+    :return: rows written
+    """
+    rows = iter_keyset(UserModel.objects.values_list(*FIELDS), chunk_size, key=itemgetter(0))
+    if export_format == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(FIELDS)
+        write = writer.writerow
+    else:
+        def write(row):
+            out.write(render_json(dict(zip(FIELDS, row))).decode('utf-8') + '\n')
+    for row in rows:
+        write((str(row[0]), ) + row[1:])
+        progress.add(1)
+    return progress.rows
+
+
+def read_rows(stream, import_format):
+    """
+    :param stream: text stream of an export
+    :return: generator of (line number, dict), a dict holds a `_error` for an undecodable line
+    """
+    if import_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else {'_error': 'Not a json object'}
+
+
+def _normalize(row):
+    """
+    :return: dict of FIELDS to str, '' for absent values
+    """
+    return {field: '' if row.get(field) is None else str(row[field]) for field in FIELDS}
+
+
+def _is_hash(password):
+    try:
+        identify_hasher(password)
+    except ValueError:
+        return False
+    return True
+
+
+def _prepare(rows):
+    """
+    validates one batch, column by column with the validators' check_many
+    :param rows: list of (line number, dict)
+    :return: (list of UserModel to insert, list of (line number, error))
+    """
+    errors = {}
+    valid = []
+    for line_number, row in rows:
+        if '_error' in row:
+            errors[line_number] = row['_error']
+            continue
+        row = _normalize(row)
+        missing = [field for field in FIELDS[1:] if not row[field]]
+        if missing:
+            errors[line_number] = 'Missing {}'.format(', '.join(missing))
+        else:
+            valid.append((line_number, row))
+
+    # a stored hash is imported as it is, anything else is a raw password and must pass the rules
+    raw_passwords = [(line_number, row) for line_number, row in valid if not _is_hash(row['password'])]
+    for field, validator, column in (
+            ('phone_number', PhoneNumberValidator(), valid),
+            ('gender', GenderValidator(), valid),
+            ('password', PasswordValidator(), raw_passwords)):
+        for (line_number, row), message in zip(column, validator.check_many([row[field] for _, row in column])):
+            if message is not None:
+                errors.setdefault(line_number, '{}: {}'.format(field, message))
+
+    users, seen_ids, seen_phone_numbers = [], set(), set()
+    hashed = {line_number for line_number, _ in valid} - {line_number for line_number, _ in raw_passwords}
+    for line_number, row in valid:
+        if line_number in errors:
+            continue
+        user_id = parse_user_id(row['user_id']) if row['user_id'] else uuid7()
+        try:
+            age = int(row['age'])
+            validate_email(row['email'])
+        except (ValueError, ValidationError):
+            errors[line_number] = 'Invalid age or email'
+            continue
+        if user_id is None or len(row['name']) > 50 or age < 0:
+            errors[line_number] = 'Invalid user_id, name or age'
+            continue
+        if user_id in seen_ids or row['phone_number'] in seen_phone_numbers:
+            errors[line_number] = 'Duplicate user_id or phone_number in the batch'
+            continue
+        seen_ids.add(user_id)
+        seen_phone_numbers.add(row['phone_number'])
+        password = row['password'] if line_number in hashed else make_password(row['password'])
+        users.append((line_number, UserModel(
+            user_id=user_id, name=row['name'], email=row['email'], password=password,
+            phone_number=row['phone_number'], age=age, gender=row['gender'])))
+
+    # one query each for what earlier batches and existing users already hold
+    taken_ids = set(UserModel.objects.filter(
+        user_id__in=[user.user_id for _, user in users]).values_list('user_id', flat=True))
+    # all of the batch, the index of this process does not see numbers the API registers meanwhile
+    taken_phone_numbers = set(UserModel.objects.filter(
+        phone_number__in=[user.phone_number for _, user in users]).values_list('phone_number', flat=True))
+    accepted = []
+    for line_number, user in users:
+        if user.user_id in taken_ids or user.phone_number in taken_phone_numbers:
+            errors[line_number] = 'user_id or phone_number already exists'
+        else:
+            user.populate_login_key()
+            accepted.append(user)
+    return accepted, sorted(errors.items())
+
+
+def _copy(users):
+    """
+    inserts users with Postgres COPY, one statement per batch
+    """
+    now = timezone.now()
+    fields = [UserModel._meta.get_field(name) for name in (
+        'user_id', 'name', 'login_key', 'email', 'password', 'phone_number', 'age', 'gender', 'updated_at')]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for user in users:
+        user.updated_at = now
+        writer.writerow([getattr(user, field.attname) for field in fields])
+    buffer.seek(0)
+    sql = 'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+        connection.ops.quote_name(UserModel._meta.db_table),
+        ', '.join(connection.ops.quote_name(field.column) for field in fields))
+    with connection.cursor() as cursor:
+        cursor.copy_expert(sql, buffer)
+
+
+def import_users(rows, batch_size, progress, on_error):
+    """
+    validates and inserts users one batch at a time, each batch in its own transaction
+    Postgres loads a batch with COPY, other databases with one bulk_create
+    statistics and the phone number index are kept here, the bulk paths send no signals
+    :param rows: iterable of (line number, dict) from read_rows
+    :param batch_size: rows per batch
+    :param progress: Progress, counts rows read
+    :param on_error: called with (line number, message) for every rejected row
+    :return: (rows imported, rows rejected)
+    """
+    imported = rejected = 0
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return imported, rejected
+        with transaction.atomic():
+            users, errors = _prepare(batch)
+            if users:
+                if connection.vendor == 'postgresql':
+                    _copy(users)
+                else:
+                    UserModel.objects.bulk_create(users)
+                record_created(users)
+                phone_number_index.add_many(user.phone_number for user in users)
+        for line_number, message in errors:
+            on_error(line_number, message)
+        imported += len(users)
+        rejected += len(errors)
+        progress.add(len(batch))
@@ -1,8 +1,13 @@
 from django.urls import path
-from user_api.views import UserView, UserDetailView, LoginView
+from user_api.views import UserView, UserBulkView, UserDetailView, UserLookupView, UserStatsView, LoginView, MetricsView, StatsView
 
 urlpatterns = [
     path('users/', UserView.as_view()),
+    path('users/bulk/', UserBulkView.as_view()),
+    path('users/lookup/', UserLookupView.as_view()),
+    path('users/stats/', UserStatsView.as_view()),
     path('users/<uuid:user_id>/', UserDetailView.as_view()),
     path('sessions/', LoginView.as_view()),
+    path('stats/', StatsView.as_view()),
+    path('metrics/', MetricsView.as_view()),
 ]
@@ -1,66 +1,94 @@
+import re
 from rest_framework.validators import ValidationError
 
+_NON_ASCII = re.compile('[^\x00-\x7f]').search
+_ASCII_DIGIT = re.compile('[0-9]').search
+_ASCII_UPPERCASE = re.compile('[A-Z]').search
+_PHONE_NUMBER = re.compile('010-[^-]{4}-[^-]{4}').fullmatch
 
-class PasswordValidator(object):
+
+class BatchValidatorMixin(object):
     """
-    Validator for password
+    Shared API of the validators below
+
+    A subclass defines check(value), which returns the error message for a
+    value, or None if it is valid. The mixin builds on it: check_many() does
+    the same for a whole column of values without raising, which is what
+    bulk imports want, and calling the validator raises ValidationError.
     """
 
-    def _is_sufficiently_long(self, value):
+    def check_many(self, values):
         """
-        checks whether password is at least 8 characters long
-        :return: True if does, False if does not
+        :param values: iterable of values
+        :return: list of error message or None, one per value
         """
-        return len(value) >= 8
+        check = self.check
+        return [check(value) for value in values]
+
+    def __call__(self, value, *args, **kwargs):
+        message = self.check(value)
+        if message is not None:
+            raise ValidationError(message)
 
-    def _does_contain_uppercase(self, value):
-        """
-        checks whether password contains at least one uppercase
-        :return: True if does, False if does not
-        """
-        return value.lower() != value
 
-    def _does_contain_number(self, value):
+class PasswordValidator(BatchValidatorMixin):
+    """
+    Validator for password
+    """
+    TOO_SHORT = 'Password must be at least 8 characters long'
+    NO_NUMBER = 'Password must contain number(s)'
+    NO_UPPERCASE = 'Password must contain uppercase(s)'
+
+    def check(self, value):
         """
-        checks whether password contains at least one number
-        :return: True if does, False if does not
+        checks length, then number(s), then uppercase(s)
+        ASCII passwords take precompiled scans; anything else keeps the exact
+        str.isdigit / str.lower semantics
+        :return: error message, None if valid
         """
-        return any(char.isdigit() for char in value)
-
-    def __call__(self, value, *args, **kwargs):
-        if self._is_sufficiently_long(value) is False:
-            raise ValidationError(
-                'Password must be at least 8 characters long')
-        if self._does_contain_number(value) is False:
-            raise ValidationError('Password must contain number(s)')
-        if self._does_contain_uppercase(value) is False:
-            raise ValidationError('Password must contain uppercase(s)')
+        if len(value) < 8:
+            return self.TOO_SHORT
+        if _NON_ASCII(value) is None:
+            if _ASCII_DIGIT(value) is None:
+                return self.NO_NUMBER
+            if _ASCII_UPPERCASE(value) is None:
+                return self.NO_UPPERCASE
+            return None
+        if not any(char.isdigit() for char in value):
+            return self.NO_NUMBER
+        if value.lower() == value:
+            return self.NO_UPPERCASE
+        return None
 
 
-class PhoneNumberValidator(object):
+class PhoneNumberValidator(BatchValidatorMixin):
     """
-    Validator for phone number
+    Validator for phone number, 010-XXXX-XXXX
     """
 
     def __init__(self):
         self._message = 'Invalid phone number'
 
-    def __call__(self, value, *args, **kwargs):
-        _split_number = value.split('-')
-        if len(_split_number) != 3:
-            raise ValidationError(self._message)
-        elif _split_number[0] != '010' or len(_split_number[1]) != 4 or len(_split_number[2]) != 4:
-            raise ValidationError(self._message)
+    def check(self, value):
+        return None if _PHONE_NUMBER(value) else self._message
+
+    def check_many(self, values):
+        message = self._message
+        return [None if _PHONE_NUMBER(value) else message for value in values]
 
 
-class GenderValidator(object):
+class GenderValidator(BatchValidatorMixin):
     """
     Validator for gender
     """
+    GENDERS = frozenset(('M', 'W'))
 
     def __init__(self):
         self._message = 'Invalid gender'
 
-    def __call__(self, value, *args, **kwargs):
-        if value != 'M' and value != 'W':
-            raise ValidationError(self._message)
+    def check(self, value):
+        return None if value in self.GENDERS else self._message
+
+    def check_many(self, values):
+        genders, message = self.GENDERS, self._message
+        return [None if value in genders else message for value in values]
@@ -1,25 +1,116 @@
-from django.http import Http404
+import types
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
+from user_api.bulk import create_users
+from user_api.cache import user_detail_cache
+from user_api.compression import compression_metrics
+from user_api.conditional import is_conditional, last_modified, not_modified, page_etag, set_validators, user_etag
+from user_api.db.backends.mixins import get_pools
+from user_api.db.metrics import connect_metrics
+from user_api.db.router import current_replica, replica_reads, replica_set
+from user_api.filters import UserFilter
+from user_api.instrumentation import InstrumentedAPIView, request_metrics, timed
+from user_api.login import find_user_by_credentials
+from user_api.lookup import detail_cache_entry, lookup_users, parse_user_id
 from user_api.models import UserModel
-from user_api.serializers import UserSerializer, UserCreateSerializer, LoginSerializer, LoginResultSerializer
+from user_api.pagination import UserCursorPagination
+from user_api.phone_index import phone_number_index
+from user_api.parsers import NDJSONParser
+from user_api.renderers import COMPACT_RENDERERS, NDJSONRenderer
+from user_api.representation import accepts_fast_json, render_json
+from user_api.serializers import UserCreateSerializer, LoginSerializer, login_result_representation, \
+    user_fields_representation, user_representation
+from user_api.stats import summary as user_stats_summary
+from user_api.streaming import STREAM_FORMATS, stream_queryset
+from user_api.throttling import LoginThrottle
+from user_api.tokens import SessionToken, token_signer
 
 
-class UserView(APIView):
+def get_representation(request):
+    """
+    representation picked by `?fields=name,age`, the default one without it
+    :return: (RowRepresentation, True if narrowed by fields)
+    """
+    fields = request.query_params.get('fields')
+    if fields is None:
+        return user_representation, False
+    try:
+        return user_fields_representation.restrict(field.strip() for field in fields.split(',')), True
+    except ValueError as error:
+        raise ValidationError({'fields': str(error)})
+
+
+def get_variant(request, representation, narrowed):
+    """
+    :return: what besides the rows decides the response bytes, for the ETag; '' for plain json
+    """
+    variant = '' if accepts_fast_json(request) else request.accepted_media_type
+    if narrowed:
+        variant += ';fields=' + ','.join(representation.names)
+    return variant
+
+
+class UserView(InstrumentedAPIView):
     """
     View for all users
     """
+    pagination_class = UserCursorPagination
+    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + COMPACT_RENDERERS + (NDJSONRenderer, )
 
+    @replica_reads()
     def get(self, request):
         """
-        GET - All users list
+        GET - Users list, one page at a time
+        `?cursor=` walks the pages, `?stream=json|ndjson` exports every user
+        filters: `?gender=`, `?age_min=`, `?age_max=`, `?name=` and `?email=` prefixes
+        sorting: `?ordering=` one of UserCursorPagination.orderings
+        `?fields=user_id,name` selects and returns only those columns
+        json by default, MessagePack, CBOR or ndjson through the Accept header
         :param request: http request
-        :return: json object containing all user information
+        :return: json object containing a page of user information
         """
-        all_users = UserModel.objects.all()
-        all_users_serializer = UserSerializer(all_users, many=True)
-        return Response(all_users_serializer.data)
+        representation, narrowed = get_representation(request)
+        user_filter = UserFilter(request.query_params, queryset=UserModel.objects.all())
+        if not user_filter.is_valid():
+            return Response(user_filter.errors, status.HTTP_400_BAD_REQUEST)
+        all_users = user_filter.qs
+
+        stream_format = request.query_params.get('stream')
+        if stream_format is not None:
+            if stream_format not in STREAM_FORMATS:
+                return Response({'error': 'Unsupported stream format'}, status.HTTP_400_BAD_REQUEST)
+            # streamed after the view returns, so fix the database while the routing applies
+            return stream_queryset(all_users.order_by('user_id').using(all_users.db), representation, stream_format)
+
+        paginator = self.pagination_class()
+        # the cursor is built from the ordering columns, whatever the client asked for
+        columns = {'user_id', 'updated_at'}.union(representation.columns, (
+            field.lstrip('-') for field in paginator.get_ordering(request, all_users, self)))
+        page = paginator.paginate_queryset(all_users.values(*columns), request, view=self)
+        links = paginator.get_next_link(), paginator.get_previous_link()
+        etag = page_etag(((row['user_id'], row['updated_at']) for row in page), request.META.get('QUERY_STRING', ''),
+                         links, get_variant(request, representation, narrowed))
+        modified = last_modified(row['updated_at'] for row in page)
+        response = not_modified(request, etag, modified)
+        if response is None:
+            with timed('serialize'):
+                data = {
+                    'next': links[0],
+                    'previous': links[1],
+                    'results': representation.many(page),
+                }
+                if accepts_fast_json(request):
+                    response = HttpResponse(render_json(data), content_type='application/json')
+                else:
+                    response = Response(data)
+        return set_validators(response, etag, modified)
 
     def post(self, request):
         """
@@ -28,60 +119,284 @@ class UserView(APIView):
         :return: json object containing created user info
         """
         new_user_serializer = UserCreateSerializer(data=request.data)
-        if new_user_serializer.is_valid():
-            new_user_serializer.create(validated_data=request.data)
-            return Response(new_user_serializer.data, status=status.HTTP_201_CREATED)
+        with timed('serialize'):
+            is_valid = new_user_serializer.is_valid()
+        if is_valid:
+            new_user_serializer.create(validated_data=new_user_serializer.validated_data)
+            with timed('serialize'):
+                data = new_user_serializer.data
+            return Response(data, status=status.HTTP_201_CREATED)
         else:
             return Response(new_user_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserDetailView(APIView):
+class UserBulkView(InstrumentedAPIView):
+    """
+    View for registering many users at once
+    """
+    parser_classes = (JSONParser, NDJSONParser)
+
+    def post(self, request):
+        """
+        POST - Create users from a json array or an ndjson stream
+        :param request: http request
+        :return: json object containing per-item results,
+                 http 201 if all created, 207 if some failed, 400 if none created
+        """
+        items = request.data
+        # a json array, or the lazy NDJSONParser stream; objects and scalars are not
+        if not isinstance(items, (list, types.GeneratorType)):
+            return Response({'error': 'Expected a list of users'}, status.HTTP_400_BAD_REQUEST)
+
+        results = create_users(items, chunk_size=getattr(settings, 'USER_BULK_CHUNK_SIZE', 500))
+        created = sum(1 for result in results if result['status'] == status.HTTP_201_CREATED)
+        if not results or created == 0:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif created == len(results):
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+        return Response({'created': created, 'failed': len(results) - created, 'results': results},
+                        status=response_status)
+
+
+class UserStatsView(InstrumentedAPIView):
+    """
+    View for user counts by gender and age band
+    """
+
+    @replica_reads()
+    def get(self, request):
+        """
+        GET - Precomputed user statistics, one small query whatever the number of users
+        :param request: http request
+        :return: json object containing totals by gender, by age band and by both
+        """
+        return Response(user_stats_summary())
+
+
+class UserLookupView(InstrumentedAPIView):
+    """
+    View for resolving many users by id at once
+    """
+    # a read sent as POST for the size of its body, it does not pin the client to the primary
+    read_only = True
+
+    @replica_reads()
+    def post(self, request):
+        """
+        POST - Users by id, `{"ids": ["<uuid>", ...]}`
+        answered from the detail cache where possible, the rest with one IN query
+        :param request: http request
+        :return: json object containing one result per requested id, in request order:
+                 status 200 with the user as users/<uuid>/ shows it, 404 unknown, 400 not a user id
+        """
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list):
+            return Response({'ids': 'Expected a list of user ids'}, status.HTTP_400_BAD_REQUEST)
+        max_ids = getattr(settings, 'USER_LOOKUP_MAX_IDS', 1000)
+        if len(ids) > max_ids:
+            return Response({'ids': 'At most {} ids per request'.format(max_ids)}, status.HTTP_400_BAD_REQUEST)
+
+        user_ids = [parse_user_id(value) for value in ids]
+        bodies = lookup_users(user_id for user_id in user_ids if user_id is not None)
+        with timed('serialize'):
+            results = []
+            for value, user_id in zip(ids, user_ids):
+                if user_id is None:
+                    results.append(render_json({'id': value, 'status': status.HTTP_400_BAD_REQUEST,
+                                                'error': 'Not a user id'}))
+                elif user_id in bodies:
+                    # the cached body is spliced in as it is, in place of the closing brace
+                    results.append(render_json({'id': value, 'status': status.HTTP_200_OK})[:-1] +
+                                   b',"user":' + bodies[user_id] + b'}')
+                else:
+                    results.append(render_json({'id': value, 'status': status.HTTP_404_NOT_FOUND}))
+            body = b'{"results":[' + b','.join(results) + b']}'
+        return HttpResponse(body, content_type='application/json')
+
+
+class UserDetailView(InstrumentedAPIView):
     """
     View for single user
     """
+    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + COMPACT_RENDERERS
+
+    def _get_row(self, user_id, representation):
+        row = UserModel.objects.filter(user_id=user_id).values(
+            'user_id', 'updated_at', *representation.columns).first()
+        if row is None:
+            raise Http404
+        return row
+
+    def _set_missing(self, user_id):
+        # a lagging replica may not have the user yet, only the primary is trusted to say it is gone
+        if current_replica() is None:
+            user_detail_cache.set_missing(user_id)
+
+    def _get_updated_at(self, user_id):
+        """
+        fetches only the row version, for answering conditional requests
+        """
+        updated_at = UserModel.objects.filter(user_id=user_id).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            self._set_missing(user_id)
+            raise Http404
+        return updated_at
 
-    def _get_object(self, user_id):
-        try:
-            return UserModel.objects.get(user_id=user_id)
-        except UserModel.DoesNotExist:
+    def _render(self, user_id):
+        """
+        loads and renders user, storing the result in the detail cache when read from the primary
+        :return: (etag, last modified timestamp, json body)
+        """
+        row = UserModel.objects.filter(user_id=user_id).values(
+            'user_id', 'updated_at', *user_representation.columns).first()
+        if row is None:
+            self._set_missing(user_id)
             raise Http404
+        cached = detail_cache_entry(row)
+        # a lagging replica could cache the body an invalidation just dropped, for the whole TIMEOUT
+        if current_replica() is None:
+            user_detail_cache.set(user_id, cached)
+        return cached
 
+    @replica_reads()
     def get(self, request, user_id):
         """
         GET - Single user detail
+        answers If-None-Match / If-Modified-Since with 304 when the user is unchanged
+        `?fields=` and formats other than json skip the detail cache
         :param request: http request
         :param user_id: user id of object
         :return: json object containing single user detail
         """
-        user_model = self._get_object(user_id=user_id)
-        user_serializer = UserSerializer(user_model)
-        return Response(user_serializer.data)
+        representation, narrowed = get_representation(request)
+        if narrowed or not accepts_fast_json(request):
+            row = self._get_row(user_id, representation)
+            etag = user_etag(row['user_id'], row['updated_at'], get_variant(request, representation, narrowed))
+            modified = last_modified([row['updated_at']])
+            response = not_modified(request, etag, modified)
+            if response is None:
+                with timed('serialize'):
+                    response = Response(representation.to_dict(row))
+            return set_validators(response, etag, modified)
 
+        cached = user_detail_cache.get(user_id)
+        if cached == user_detail_cache.MISSING:
+            raise Http404
+
+        if cached is None and is_conditional(request):
+            updated_at = self._get_updated_at(user_id)
+            etag, modified = user_etag(user_id, updated_at), last_modified([updated_at])
+            response = not_modified(request, etag, modified)
+            if response is not None:
+                return set_validators(response, etag, modified)
+
+        if cached is None:
+            cached = self._render(user_id)
+        etag, modified, body = cached
+        response = not_modified(request, etag, modified)
+        if response is None:
+            response = HttpResponse(body, content_type='application/json')
+        return set_validators(response, etag, modified)
 
-class LoginView(APIView):
+
+class StatsView(APIView):
+    """
+    View for in-process runtime counters
+    """
+
+    def get(self, request):
+        """
+        GET - Cache and database connection counters of this worker
+        :param request: http request
+        :return: json object containing counters per component
+        """
+        pools = {'{}:{}'.format(alias, name): pool.stats() for (alias, name), pool in get_pools().items()}
+        return Response({
+            'user_detail_cache': user_detail_cache.stats(),
+            'db_connect': connect_metrics.stats(),
+            'db_pools': pools,
+            'db_replicas': replica_set.stats(),
+            'login_throttle': LoginThrottle.stats(),
+            'compression': compression_metrics.stats(),
+            'phone_number_index': phone_number_index.stats(),
+        })
+
+
+class LoginView(InstrumentedAPIView):
     """
     View for login result
     """
+    login_throttle_class = LoginThrottle
+
+    def get_permissions(self):
+        # logging out needs the token only, logging in stays with the staff API clients
+        if self.request.method == 'DELETE':
+            return [IsAuthenticated()]
+        return super(LoginView, self).get_permissions()
+
+    def initial(self, request, *args, **kwargs):
+        """
+        throttles ahead of authentication, so a rejected attempt costs
+        neither a query nor a password hash
+        """
+        if request.method == 'POST':
+            throttle = self.login_throttle_class()
+            if not throttle.allow_request(request, self):
+                self.throttled(request, throttle.wait())
+        super(LoginView, self).initial(request, *args, **kwargs)
 
     def post(self, request):
         """
         POST - Login method
         :param request: http request
-        :return: user's uuid if successful, http 400 if error
+        :return: user's uuid and a bearer token for later requests if successful, http 400 if error
         """
 
         request_serializer = LoginSerializer(data=request.data)
-        if request_serializer.is_valid() is False:
+        with timed('serialize'):
+            is_valid = request_serializer.is_valid()
+        if is_valid is False:
             return Response(request_serializer.errors, status.HTTP_400_BAD_REQUEST)
 
-        matching_models = UserModel.objects.filter(
-            name=request.data['name']).filter(password=request.data['password'])
-        if len(matching_models) == 0:
+        user_model = find_user_by_credentials(
+            request_serializer.validated_data['name'], request_serializer.validated_data['password'])
+        if user_model is None:
             return Response({'error': 'ID or password is incorrect'}, status.HTTP_400_BAD_REQUEST)
 
-        for model in matching_models:
-            compare_serializer = LoginSerializer(model)
-            if request_serializer.data == compare_serializer.data:
-                return Response(LoginResultSerializer(model).data, status.HTTP_200_OK)
+        with timed('serialize'):
+            data = login_result_representation.from_instance(user_model)
+        # without a revocation cache shared by the workers no token is issued, see settings.SESSION_TOKENS
+        if token_signer is not None:
+            data['token'] = token_signer.issue(user_model.user_id)
+            data['expires_in'] = token_signer.ttl
+        return Response(data, status.HTTP_200_OK)
 
-        return Response({'error': 'ID or password is incorrect'}, status.HTTP_400_BAD_REQUEST)
+    def delete(self, request):
+        """
+        DELETE - Logout, revokes the bearer token the request was made with
+        :param request: http request
+        :return: http 204, http 400 if the request did not use a token
+        """
+        if not isinstance(request.auth, SessionToken):
+            return Response({'error': 'Not authenticated with a session token'}, status.HTTP_400_BAD_REQUEST)
+        token_signer.revoke(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MetricsView(APIView):
+    """
+    View for the request histograms in the Prometheus text format
+    """
+
+    def get(self, request):
+        """
+        GET - Scrape endpoint, covers the sampled requests of this worker
+        :param request: http request
+        :return: text/plain exposition
+        """
+        sample_rate = getattr(settings, 'INSTRUMENTATION', {}).get('SAMPLE_RATE', 0.1)
+        body = request_metrics.exposition(sample_rate) + '\n'.join(compression_metrics.exposition()) + '\n'
+        return HttpResponse(body,
+                            content_type='text/plain; version=0.0.4; charset=utf-8')